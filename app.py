@@ -5,17 +5,15 @@ Interfaz principal para la generación, visualización y exportación de Q&A
 
 import asyncio
 import os
-import sys
+import shutil
+from itertools import chain
 from pathlib import Path
 from typing import Dict, List, Any
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime
 
-# Agregar el directorio raíz al path
-sys.path.insert(0, str(Path(__file__).parent))
+# pandas y plotly se importan de forma diferida dentro de las funciones
+# que los usan para acortar el arranque en frío de la aplicación
 
 from config.settings import settings
 from src.utils.logger import get_logger
@@ -34,13 +32,143 @@ st.set_page_config(
 
 logger = get_logger(__name__)
 
+@st.cache_resource
+def get_data_manager() -> QADataManager:
+    """Obtener instancia única del data manager (compartida entre reruns)"""
+    return QADataManager()
+
+@st.cache_resource
+def get_prompt_generator() -> PromptQAGenerator:
+    """Obtener instancia única del generador de prompts"""
+    return PromptQAGenerator()
+
+@st.cache_resource
+def get_document_processor() -> DocumentQAProcessor:
+    """Obtener instancia única del procesador de documentos"""
+    return DocumentQAProcessor()
+
+@st.cache_resource
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Obtener un event loop persistente para toda la sesión.
+
+    Evita crear y destruir un loop por click (asyncio.run), lo que
+    cerraba los pools de conexiones de los clientes LLM entre reruns.
+    """
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    return loop
+
+def run_async(coro):
+    """Ejecutar una corrutina en el loop persistente de la sesión"""
+    return get_event_loop().run_until_complete(coro)
+
+@st.cache_data(ttl=60)
+def get_api_status() -> Dict[str, bool]:
+    """Estado de las API keys, cacheado para no validar dos veces por rerun"""
+    return settings.validate_api_keys()
+
+def data_fingerprint(batches: List[QABatch]) -> tuple:
+    """Huella estable de los datos en sesión para claves de caché"""
+    return tuple((batch.id, len(batch.items)) for batch in batches)
+
+@st.cache_data
+def build_qa_index(fingerprint: tuple, _items: List[QAItem]) -> Dict[str, Any]:
+    """Índice invertido categoría/nivel -> posiciones, cacheado por huella
+
+    Incluye también el texto en minúsculas por posición para que la
+    búsqueda por teclado no re-normalice todos los items en cada pulsación.
+    """
+    por_categoria: Dict[str, set] = {}
+    por_nivel: Dict[str, set] = {}
+    texto_lower: List[tuple] = []
+
+    for idx, item in enumerate(_items):
+        por_categoria.setdefault(item.categoria, set()).add(idx)
+        por_nivel.setdefault(item.nivel, set()).add(idx)
+        texto_lower.append(item.texto_busqueda)
+
+    return {"categoria": por_categoria, "nivel": por_nivel, "texto_lower": texto_lower}
+
+@st.cache_data
+def filter_qa_items(
+    fingerprint: tuple,
+    categoria: str,
+    nivel: str,
+    confianza_min: float,
+    busqueda: str,
+    _items: List[QAItem]
+) -> List[QAItem]:
+    """Filtrar items usando el índice invertido, cacheado por huella + filtros"""
+    index = build_qa_index(fingerprint, _items)
+
+    # Los filtros exactos se resuelven por intersección de índices
+    indices = set(range(len(_items)))
+    if categoria != "Todas":
+        indices &= index["categoria"].get(categoria, set())
+    if nivel != "Todos":
+        indices &= index["nivel"].get(nivel, set())
+
+    # Confianza y búsqueda requieren escanear solo los candidatos restantes;
+    # la búsqueda usa el texto pre-normalizado del índice
+    busqueda_lower = busqueda.lower() if busqueda else ""
+    texto_lower = index["texto_lower"]
+    return [
+        _items[i] for i in sorted(indices)
+        if _items[i].confianza >= confianza_min
+        and (not busqueda_lower
+             or busqueda_lower in texto_lower[i][0]
+             or busqueda_lower in texto_lower[i][1])
+    ]
+
+@st.cache_data
+def items_to_dataframe(fingerprint: tuple, _items: List[QAItem]) -> "pd.DataFrame":
+    """Construir un DataFrame columnar de los items, cacheado por huella"""
+    import pandas as pd
+
+    return pd.DataFrame({
+        "categoria": [item.categoria for item in _items],
+        "nivel": [item.nivel for item in _items],
+        "confianza": [item.confianza for item in _items],
+        "fecha_creacion": [item.fecha_creacion for item in _items]
+    })
+
+@st.cache_data
+def build_pie_chart(counts: tuple, title: str):
+    """Figura de pastel cacheada por distribución de valores"""
+    import plotly.express as px
+
+    return px.pie(
+        values=[valor for _, valor in counts],
+        names=[nombre for nombre, _ in counts],
+        title=title
+    )
+
+@st.cache_data
+def build_bar_chart(counts: tuple, title: str):
+    """Figura de barras cacheada por distribución de valores"""
+    import plotly.express as px
+
+    return px.bar(
+        x=[nombre for nombre, _ in counts],
+        y=[valor for _, valor in counts],
+        title=title
+    )
+
+@st.cache_data
+def build_histogram(values: tuple, title: str, nbins: int = 20):
+    """Histograma cacheado por los valores de entrada"""
+    import plotly.express as px
+
+    return px.histogram(x=values, nbins=nbins, title=title)
+
 class QAGeneratorApp:
     """Clase principal de la aplicación Streamlit"""
-    
+
     def __init__(self):
-        self.data_manager = QADataManager()
-        self.prompt_generator = PromptQAGenerator()
-        self.document_processor = DocumentQAProcessor()
+        # Instancias pesadas cacheadas para no reconstruirlas en cada rerun
+        self.data_manager = get_data_manager()
+        self.prompt_generator = get_prompt_generator()
+        self.document_processor = get_document_processor()
         
         # Inicializar session state
         if "qa_data" not in st.session_state:
@@ -49,15 +177,44 @@ class QAGeneratorApp:
             st.session_state.current_batch = None
         if "export_history" not in st.session_state:
             st.session_state.export_history = []
-    
-    def render_header(self):
+
+    def get_all_items(self) -> List[QAItem]:
+        """Vista plana de todos los items, reconstruida solo si los datos cambian"""
+        fingerprint = data_fingerprint(st.session_state.qa_data)
+        if st.session_state.get("all_items_fingerprint") != fingerprint:
+            st.session_state.all_items_cache = list(
+                chain.from_iterable(batch.items for batch in st.session_state.qa_data)
+            )
+            st.session_state.all_items_fingerprint = fingerprint
+        return st.session_state.all_items_cache
+
+    def sync_data_manager(self):
+        """Sincronizar el data manager con los batches de la sesión
+
+        El manager viene de st.cache_resource y sobrevive a la sesión:
+        tras recargar la página puede retener batches de la sesión
+        anterior que esta ya no conoce. Se reconcilia por id de batch:
+        si el manager tiene batches ajenos a la sesión se lo vacía y se
+        re-agrega todo; los que ya tiene no se re-agregan.
+        """
+        unifier = self.data_manager.unifier
+        ids_sesion = {batch.id for batch in st.session_state.qa_data}
+        ids_manager = {batch.id for batch in unifier.batches}
+
+        if ids_manager - ids_sesion:
+            unifier.clear()
+            ids_manager = set()
+
+        for batch in st.session_state.qa_data:
+            if batch.id not in ids_manager:
+                self.data_manager.add_data(batch)
+
+
+    def render_header(self, api_status: Dict[str, bool]):
         """Renderizar header principal"""
         st.title("🤖 Generador Modular de Q&A")
         st.markdown("**Genera preguntas y respuestas a partir de prompts temáticos o documentos**")
-        
-        # Validar APIs
-        api_status = settings.validate_api_keys()
-        
+
         col1, col2, col3, col4 = st.columns(4)
         with col1:
             status_icon = "✅" if api_status["openai"] else "❌"
@@ -74,16 +231,15 @@ class QAGeneratorApp:
         
         st.divider()
     
-    def render_sidebar(self):
+    def render_sidebar(self, api_status: Dict[str, bool]):
         """Renderizar sidebar con configuración"""
         with st.sidebar:
             st.header("⚙️ Configuración")
-            
+
             # Configuración de modelo
             st.subheader("Modelo de IA")
             available_providers = []
-            api_status = settings.validate_api_keys()
-            
+
             if api_status["openai"]:
                 available_providers.append("openai")
             if api_status["anthropic"]:
@@ -150,6 +306,11 @@ class QAGeneratorApp:
                 "Usar búsqueda avanzada",
                 help="Usa Perplexity para información actualizada"
             )
+            modo_batch = st.checkbox(
+                "Modo batch (50% más barato)",
+                help="Envía el lote a la Batch API de OpenAI. Más lento pero a mitad de costo.",
+                disabled=config["modelo"] != "openai"
+            )
         
         if st.button("🚀 Generar Q&A desde Prompt", type="primary", disabled=not prompt_text):
             with st.spinner("Generando Q&A..."):
@@ -166,9 +327,41 @@ class QAGeneratorApp:
                         usar_busqueda_avanzada=usar_busqueda
                     )
                     
-                    # Generar Q&A (ejecutar función async)
-                    batch = asyncio.run(self.prompt_generator.generate_qa_batch(request))
-                    
+                    if modo_batch:
+                        # Enviar a la Batch API y esperar mostrando el estado
+                        from src.generators.batch_processor import BatchProcessor
+
+                        processor = BatchProcessor()
+                        batch_id = processor.submit_batch(request)
+
+                        st.session_state.export_history.append({
+                            "fecha": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                            "archivo": f"batch_job:{batch_id}",
+                            "formato": "batch_api",
+                            "items": num_preguntas
+                        })
+
+                        with st.status(f"Batch job enviado: `{batch_id}`") as status:
+                            batch = processor.wait_for_batch(batch_id, request)
+                            if batch is None:
+                                status.update(label="Batch job fallido o expirado", state="error")
+                                st.stop()
+                            status.update(label="Batch job completado", state="complete")
+                    else:
+                        # Generar Q&A mostrando progreso parcial a medida
+                        # que las llamadas al LLM van terminando
+                        progreso = st.empty()
+
+                        def reportar_progreso(completadas, total, generadas):
+                            progreso.write(
+                                f"⏳ {generadas} Q&A generadas ({completadas}/{total} llamadas)"
+                            )
+
+                        batch = run_async(self.prompt_generator.generate_qa_batch(
+                            request, progress_callback=reportar_progreso
+                        ))
+                        progreso.empty()
+
                     # Guardar en session state
                     st.session_state.qa_data.append(batch)
                     st.session_state.current_batch = batch
@@ -209,13 +402,14 @@ class QAGeneratorApp:
             if st.button("📝 Procesar Documento", type="primary"):
                 with st.spinner("Procesando documento..."):
                     try:
-                        # Guardar archivo temporalmente
+                        # Guardar archivo temporalmente (en streaming para no
+                        # materializar documentos grandes en memoria)
                         temp_path = settings.DOCUMENTS_DIR / uploaded_file.name
                         with open(temp_path, "wb") as f:
-                            f.write(uploaded_file.getbuffer())
+                            shutil.copyfileobj(uploaded_file, f, length=1024 * 1024)
                         
                         # Procesar documento
-                        batch = asyncio.run(
+                        batch = run_async(
                             self.document_processor.process_document(
                                 str(temp_path),
                                 categoria=config["categoria"],
@@ -259,26 +453,33 @@ class QAGeneratorApp:
         with tab3:
             self.render_data_management()
     
+    @st.fragment
     def render_qa_explorer(self):
-        """Renderizar explorador de Q&A"""
-        # Combinar todos los items
-        all_items = []
-        for batch in st.session_state.qa_data:
-            all_items.extend(batch.items)
-        
+        """Renderizar explorador de Q&A
+
+        Fragmento aislado: cambiar filtros o buscar solo re-ejecuta esta
+        sección, no el script completo.
+        """
+        # Vista plana cacheada de todos los items
+        all_items = self.get_all_items()
+
         if not all_items:
             return
         
-        # Filtros
+        # Filtros (las opciones salen del índice invertido cacheado)
+        qa_index = build_qa_index(data_fingerprint(st.session_state.qa_data), all_items)
+
         col1, col2, col3, col4 = st.columns(4)
-        
+
         with col1:
-            categorias = list(set(item.categoria for item in all_items))
-            categoria_filter = st.selectbox("Filtrar por categoría", ["Todas"] + categorias)
-        
+            categoria_filter = st.selectbox(
+                "Filtrar por categoría", ["Todas"] + list(qa_index["categoria"])
+            )
+
         with col2:
-            niveles = list(set(item.nivel for item in all_items))
-            nivel_filter = st.selectbox("Filtrar por nivel", ["Todos"] + niveles)
+            nivel_filter = st.selectbox(
+                "Filtrar por nivel", ["Todos"] + list(qa_index["nivel"])
+            )
         
         with col3:
             confianza_min = st.slider("Confianza mínima", 0.0, 1.0, 0.0)
@@ -286,24 +487,16 @@ class QAGeneratorApp:
         with col4:
             busqueda = st.text_input("Buscar en preguntas/respuestas")
         
-        # Aplicar filtros
-        filtered_items = all_items.copy()
-        
-        if categoria_filter != "Todas":
-            filtered_items = [item for item in filtered_items if item.categoria == categoria_filter]
-        
-        if nivel_filter != "Todos":
-            filtered_items = [item for item in filtered_items if item.nivel == nivel_filter]
-        
-        filtered_items = [item for item in filtered_items if item.confianza >= confianza_min]
-        
-        if busqueda:
-            busqueda_lower = busqueda.lower()
-            filtered_items = [
-                item for item in filtered_items 
-                if busqueda_lower in item.pregunta.lower() or busqueda_lower in item.respuesta.lower()
-            ]
-        
+        # Aplicar filtros (un solo paso, cacheado por estado de filtros)
+        filtered_items = filter_qa_items(
+            data_fingerprint(st.session_state.qa_data),
+            categoria_filter,
+            nivel_filter,
+            confianza_min,
+            busqueda,
+            all_items
+        )
+
         st.write(f"**Mostrando {len(filtered_items)} de {len(all_items)} elementos**")
         
         # Mostrar items
@@ -324,67 +517,55 @@ class QAGeneratorApp:
                     if item.fuentes:
                         st.markdown(f"**📚 Fuentes:** {', '.join(item.fuentes[:2])}{'...' if len(item.fuentes) > 2 else ''}")
     
+    @st.fragment
     def render_statistics(self):
-        """Renderizar estadísticas"""
-        # Combinar todos los items
-        all_items = []
-        for batch in st.session_state.qa_data:
-            all_items.extend(batch.items)
-        
+        """Renderizar estadísticas (fragmento aislado del resto del script)"""
+        # Vista plana cacheada de todos los items
+        all_items = self.get_all_items()
+
         if not all_items:
             return
-        
+
+        df = items_to_dataframe(data_fingerprint(st.session_state.qa_data), all_items)
+
         # Métricas generales
         col1, col2, col3, col4 = st.columns(4)
-        
+
         with col1:
-            st.metric("Total Q&A", len(all_items))
+            st.metric("Total Q&A", len(df))
         with col2:
             st.metric("Batches", len(st.session_state.qa_data))
         with col3:
-            avg_confidence = sum(item.confianza for item in all_items) / len(all_items)
-            st.metric("Confianza Promedio", f"{avg_confidence:.2f}")
+            st.metric("Confianza Promedio", f"{df['confianza'].mean():.2f}")
         with col4:
-            categorias_unicas = len(set(item.categoria for item in all_items))
-            st.metric("Categorías Únicas", categorias_unicas)
-        
+            st.metric("Categorías Únicas", df["categoria"].nunique())
+
         # Gráficos
         col1, col2 = st.columns(2)
-        
+
         with col1:
             # Distribución por categoría
-            categoria_counts = {}
-            for item in all_items:
-                categoria_counts[item.categoria] = categoria_counts.get(item.categoria, 0) + 1
-            
-            if categoria_counts:
-                fig_cat = px.pie(
-                    values=list(categoria_counts.values()),
-                    names=list(categoria_counts.keys()),
-                    title="Distribución por Categoría"
+            categoria_counts = df["categoria"].value_counts()
+
+            if not categoria_counts.empty:
+                fig_cat = build_pie_chart(
+                    tuple(categoria_counts.items()), "Distribución por Categoría"
                 )
                 st.plotly_chart(fig_cat, use_container_width=True)
-        
+
         with col2:
             # Distribución por nivel
-            nivel_counts = {}
-            for item in all_items:
-                nivel_counts[item.nivel] = nivel_counts.get(item.nivel, 0) + 1
-            
-            if nivel_counts:
-                fig_nivel = px.bar(
-                    x=list(nivel_counts.keys()),
-                    y=list(nivel_counts.values()),
-                    title="Distribución por Nivel"
+            nivel_counts = df["nivel"].value_counts()
+
+            if not nivel_counts.empty:
+                fig_nivel = build_bar_chart(
+                    tuple(nivel_counts.items()), "Distribución por Nivel"
                 )
                 st.plotly_chart(fig_nivel, use_container_width=True)
-        
+
         # Histograma de confianza
-        confianzas = [item.confianza for item in all_items]
-        fig_conf = px.histogram(
-            x=confianzas,
-            nbins=20,
-            title="Distribución de Niveles de Confianza"
+        fig_conf = build_histogram(
+            tuple(df["confianza"]), "Distribución de Niveles de Confianza"
         )
         st.plotly_chart(fig_conf, use_container_width=True)
     
@@ -399,20 +580,17 @@ class QAGeneratorApp:
             
             if st.button("🔄 Fusionar Duplicados", help="Elimina elementos muy similares"):
                 if st.session_state.qa_data:
-                    # Agregar todos los batches al data manager
-                    self.data_manager.unifier.batches = []
-                    self.data_manager.unifier.unified_items = []
-                    
-                    for batch in st.session_state.qa_data:
-                        self.data_manager.add_data(batch)
-                    
+                    # Agregar solo los batches nuevos al data manager
+                    self.sync_data_manager()
+
                     # Fusionar duplicados
                     merged_count = self.data_manager.unifier.merge_similar_items()
                     st.success(f"Fusionados {merged_count} elementos duplicados")
-            
+
             if st.button("🗑️ Limpiar Todo", type="secondary"):
                 st.session_state.qa_data = []
                 st.session_state.current_batch = None
+                self.data_manager.unifier.clear()
                 st.success("Datos limpiados")
                 st.rerun()
         
@@ -463,13 +641,9 @@ class QAGeneratorApp:
         if st.button("📤 Exportar Datos", type="primary"):
             with st.spinner("Exportando datos..."):
                 try:
-                    # Preparar data manager
-                    self.data_manager.unifier.batches = []
-                    self.data_manager.unifier.unified_items = []
-                    
-                    for batch in st.session_state.qa_data:
-                        self.data_manager.add_data(batch)
-                    
+                    # Preparar data manager (solo los batches nuevos)
+                    self.sync_data_manager()
+
                     # Configurar exportación
                     export_config = ExportConfig(
                         formato=formato,
@@ -477,9 +651,11 @@ class QAGeneratorApp:
                         nombre_archivo=nombre_archivo if nombre_archivo else None
                     )
                     
-                    # Exportar
-                    output_path = self.data_manager.process_and_export(export_config)
-                    
+                    # Exportar (recibiendo los bytes para la descarga sin relectura)
+                    output_path, export_bytes = self.data_manager.process_and_export(
+                        export_config, return_bytes=True
+                    )
+
                     # Guardar en historial
                     st.session_state.export_history.append({
                         "fecha": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
@@ -490,30 +666,31 @@ class QAGeneratorApp:
                     
                     st.success(f"✅ Datos exportados exitosamente: `{output_path}`")
                     
-                    # Mostrar botón de descarga si es posible
-                    if os.path.exists(output_path):
-                        with open(output_path, "rb") as file:
-                            btn = st.download_button(
-                                label="⬇️ Descargar archivo",
-                                data=file.read(),
-                                file_name=os.path.basename(output_path),
-                                mime="application/octet-stream"
-                            )
-                    
+                    # Botón de descarga alimentado con los bytes ya serializados
+                    st.download_button(
+                        label="⬇️ Descargar archivo",
+                        data=export_bytes,
+                        file_name=os.path.basename(output_path),
+                        mime="application/octet-stream"
+                    )
+
                 except Exception as e:
                     st.error(f"Error exportando datos: {str(e)}")
                     logger.error(f"Error en exportación: {e}")
         
         # Historial de exportaciones
         if st.session_state.export_history:
+            import pandas as pd
+
             st.subheader("📋 Historial de Exportaciones")
             df_history = pd.DataFrame(st.session_state.export_history)
             st.dataframe(df_history, use_container_width=True)
     
     def run(self):
         """Ejecutar la aplicación principal"""
-        self.render_header()
-        config = self.render_sidebar()
+        api_status = get_api_status()
+        self.render_header(api_status)
+        config = self.render_sidebar(api_status)
         
         # Pestañas principales
         tab1, tab2, tab3, tab4 = st.tabs([
@@ -3,21 +3,19 @@ Aplicación Streamlit simplificada para el Generador Modular de Q&A
 Versión compatible sin dependencias complejas de logging
 """
 
-import asyncio
 import os
-import sys
 from pathlib import Path
 from typing import Dict, List, Any
 import streamlit as st
-import pandas as pd
-
-# Agregar el directorio raíz al path
-sys.path.insert(0, str(Path(__file__).parent))
 
 from config.settings import settings
 from src.utils.data_models import QAItem, QABatch, GenerationRequest, ExportConfig
+from src.utils.simple_logger import configure_logging
 from src.unifiers.data_unifier_simple import QADataManager
 
+# Configuración única de logging al arranque
+configure_logging()
+
 # Configurar página
 st.set_page_config(
     page_title="Generador Modular Q&A",
@@ -26,27 +24,201 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+@st.cache_resource
+def get_data_manager() -> QADataManager:
+    """Obtener instancia única del data manager (compartida entre reruns)"""
+    return QADataManager()
+
+@st.cache_resource
+def get_prompt_generator():
+    """Obtener el generador real de Q&A (importado solo si hay APIs)"""
+    from src.generators.prompt_generator import PromptQAGenerator
+
+    return PromptQAGenerator()
+
+@st.cache_data(ttl=3600)
+def get_api_status() -> Dict[str, bool]:
+    """Estado de las API keys, cacheado: las keys no cambian durante la sesión"""
+    return settings.validate_api_keys()
+
+def data_fingerprint(batches: List[QABatch]) -> tuple:
+    """Huella estable de los datos en sesión para claves de caché"""
+    return tuple((batch.id, len(batch.items)) for batch in batches)
+
+@st.cache_data
+def build_columns(fingerprint: tuple, _items: List[QAItem]) -> Dict[str, Any]:
+    """Vista columnar (SoA) de los items para filtrado vectorizado
+
+    Se construye una sola vez por huella de datos; las columnas de texto
+    ya vienen en minúsculas para buscar sin re-normalizar.
+    """
+    import numpy as np
+
+    return {
+        "categoria": np.asarray([item.categoria for item in _items]),
+        "pregunta_lower": np.asarray([item.texto_busqueda[0] for item in _items]),
+        "respuesta_lower": np.asarray([item.texto_busqueda[1] for item in _items])
+    }
+
+@st.cache_data
+def items_to_dataframe(fingerprint: tuple, _items: List[QAItem]) -> "pd.DataFrame":
+    """Construir un DataFrame columnar de los items, cacheado por huella"""
+    # Import diferido: pandas solo se paga al abrir las estadísticas
+    import pandas as pd
+
+    return pd.DataFrame({
+        "categoria": [item.categoria for item in _items],
+        "nivel": [item.nivel for item in _items],
+        "confianza": [item.confianza for item in _items]
+    })
+
+@st.cache_data(ttl=86400, max_entries=500, show_spinner=False)
+def generate_qa_cached(
+    modelo: str,
+    categoria: str,
+    nivel: str,
+    idioma: str,
+    prompt_text: str,
+    num_preguntas: int,
+    usar_busqueda: bool
+) -> QABatch:
+    """Generar Q&A reales con cache de respuestas
+
+    Peticiones idénticas (mismo modelo/tema/nivel/idioma/cantidad) se
+    resuelven desde el cache durante 24h en vez de repetir la llamada
+    al LLM, que es lo que realmente cuesta tiempo y tokens.
+    """
+    import asyncio
+
+    request = GenerationRequest(
+        tipo="prompt",
+        prompt=prompt_text,
+        categoria=categoria,
+        nivel=nivel,
+        num_preguntas=num_preguntas,
+        modelo=modelo,
+        idioma=idioma,
+        usar_busqueda_avanzada=usar_busqueda
+    )
+
+    generator = get_prompt_generator()
+    return asyncio.run(generator.generate_qa_batch(request))
+
+# Datos de demostración: constantes a nivel de módulo para no
+# reconstruir las listas/dicts en cada generación demo
+_DEMO_META = {"modo": "demo", "generado": "sistema_demo"}
+
+_DEMO_QUESTIONS = [
+    {
+        "pregunta": "¿Qué es la inteligencia artificial?",
+        "respuesta": "La inteligencia artificial es una rama de la informática que busca crear sistemas capaces de realizar tareas que normalmente requieren inteligencia humana.",
+        "tema": "fundamentos_ia"
+    },
+    {
+        "pregunta": "¿Cuáles son los tipos de machine learning?",
+        "respuesta": "Los principales tipos son: aprendizaje supervisado, no supervisado, semi-supervisado y por refuerzo.",
+        "tema": "machine_learning"
+    },
+    {
+        "pregunta": "¿Qué es el procesamiento de lenguaje natural?",
+        "respuesta": "Es una rama de la IA que se enfoca en la interacción entre computadoras y el lenguaje humano natural.",
+        "tema": "nlp"
+    },
+    {
+        "pregunta": "¿Cómo funciona una red neuronal?",
+        "respuesta": "Las redes neuronales procesan información a través de capas de nodos interconectados que imitan el funcionamiento básico de las neuronas.",
+        "tema": "redes_neuronales"
+    },
+    {
+        "pregunta": "¿Qué aplicaciones tiene la IA en la vida cotidiana?",
+        "respuesta": "La IA se usa en asistentes virtuales, recomendaciones en streaming, navegación GPS, reconocimiento de voz y detección de fraude.",
+        "tema": "aplicaciones_ia"
+    }
+]
+
 class SimpleQAGeneratorApp:
     """Clase principal de la aplicación Streamlit simplificada"""
     
     def __init__(self):
-        self.data_manager = QADataManager()
-        
-        # Inicializar session state
-        if "qa_data" not in st.session_state:
-            st.session_state.qa_data = []
-        if "current_batch" not in st.session_state:
-            st.session_state.current_batch = None
-        if "export_history" not in st.session_state:
-            st.session_state.export_history = []
-    
+        # Instancia cacheada para no reconstruirla en cada rerun
+        self.data_manager = get_data_manager()
+
+        # Inicializar session state: setdefault evita la cascada de
+        # comprobaciones "not in" en cada rerun
+        st.session_state.setdefault("qa_data", [])
+        st.session_state.setdefault("current_batch", None)
+        st.session_state.setdefault("export_history", [])
+        st.session_state.setdefault("total_items", 0)
+
+        # Restaurar el snapshot de una sesión anterior: recargar la
+        # página ya no obliga a regenerar (y re-pagar) los batches
+        if not st.session_state.qa_data:
+            self._load_snapshot()
+
+    @property
+    def _snapshot_path(self) -> Path:
+        return settings.OUTPUT_DIR / "session_snapshot.pkl"
+
+    def _load_snapshot(self):
+        """Recargar los batches persistidos en disco, si existen"""
+        if not self._snapshot_path.exists():
+            return
+
+        import pickle
+
+        try:
+            with open(self._snapshot_path, "rb") as f:
+                batches = pickle.load(f)
+            st.session_state.qa_data = batches
+            st.session_state.total_items = sum(len(b.items) for b in batches)
+        except Exception:
+            # Snapshot corrupto o de una versión incompatible del
+            # modelo: ignorarlo y empezar con la sesión vacía
+            pass
+
+    def _save_snapshot(self):
+        """Persistir los batches de la sesión a disco"""
+        import pickle
+
+        with open(self._snapshot_path, "wb") as f:
+            pickle.dump(st.session_state.qa_data, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def append_batch(self, batch: QABatch):
+        """Agregar un batch a la sesión manteniendo el contador de items"""
+        st.session_state.qa_data.append(batch)
+        st.session_state.total_items += len(batch.items)
+        self._save_snapshot()
+
+    def sync_data_manager(self):
+        """Sincronizar el data manager con los batches de la sesión
+
+        El manager viene de st.cache_resource y sobrevive a la sesión;
+        tras una recarga, el snapshot restaura en la sesión los mismos
+        batches que el manager ya contiene. Se reconcilia por id de
+        batch: los que el manager ya tiene no se re-agregan (evita
+        duplicarlos en cada recarga) y, si retiene batches ajenos a la
+        sesión, se lo vacía y se re-agrega todo.
+        """
+        unifier = self.data_manager.unifier
+        ids_sesion = {batch.id for batch in st.session_state.qa_data}
+        ids_manager = {batch.id for batch in unifier.batches}
+
+        if ids_manager - ids_sesion:
+            unifier.clear()
+            ids_manager = set()
+
+        for batch in st.session_state.qa_data:
+            if batch.id not in ids_manager:
+                self.data_manager.add_data(batch)
+
+
     def render_header(self):
         """Renderizar header principal"""
         st.title("🤖 Generador Modular de Q&A")
         st.markdown("**Genera preguntas y respuestas a partir de prompts temáticos o documentos**")
-        
-        # Validar APIs
-        api_status = settings.validate_api_keys()
+
+        # Validar APIs (resultado cacheado)
+        api_status = get_api_status()
         
         col1, col2, col3, col4 = st.columns(4)
         with col1:
@@ -72,7 +244,7 @@ class SimpleQAGeneratorApp:
             # Configuración de modelo
             st.subheader("Modelo de IA")
             available_providers = []
-            api_status = settings.validate_api_keys()
+            api_status = get_api_status()
             
             if api_status["openai"]:
                 available_providers.append("openai")
@@ -106,11 +278,10 @@ class SimpleQAGeneratorApp:
                 index=0
             )
             
-            # Estadísticas actuales
+            # Estadísticas actuales (contador mantenido incrementalmente)
             if st.session_state.qa_data:
                 st.subheader("📊 Datos Actuales")
-                total_items = sum(len(batch.items) for batch in st.session_state.qa_data)
-                st.metric("Total Q&A", total_items)
+                st.metric("Total Q&A", st.session_state.total_items)
                 st.metric("Batches", len(st.session_state.qa_data))
             
             return {
@@ -122,51 +293,20 @@ class SimpleQAGeneratorApp:
     
     def create_demo_qa(self, config: Dict[str, Any], num_preguntas: int = 5):
         """Crear Q&A de demostración cuando no hay APIs configuradas"""
-        demo_questions = [
-            {
-                "pregunta": "¿Qué es la inteligencia artificial?",
-                "respuesta": "La inteligencia artificial es una rama de la informática que busca crear sistemas capaces de realizar tareas que normalmente requieren inteligencia humana.",
-                "tema": "fundamentos_ia"
-            },
-            {
-                "pregunta": "¿Cuáles son los tipos de machine learning?",
-                "respuesta": "Los principales tipos son: aprendizaje supervisado, no supervisado, semi-supervisado y por refuerzo.",
-                "tema": "machine_learning"
-            },
-            {
-                "pregunta": "¿Qué es el procesamiento de lenguaje natural?",
-                "respuesta": "Es una rama de la IA que se enfoca en la interacción entre computadoras y el lenguaje humano natural.",
-                "tema": "nlp"
-            },
-            {
-                "pregunta": "¿Cómo funciona una red neuronal?",
-                "respuesta": "Las redes neuronales procesan información a través de capas de nodos interconectados que imitan el funcionamiento básico de las neuronas.",
-                "tema": "redes_neuronales"
-            },
-            {
-                "pregunta": "¿Qué aplicaciones tiene la IA en la vida cotidiana?",
-                "respuesta": "La IA se usa en asistentes virtuales, recomendaciones en streaming, navegación GPS, reconocimiento de voz y detección de fraude.",
-                "tema": "aplicaciones_ia"
-            }
-        ]
-        
-        qa_items = []
-        for i, item in enumerate(demo_questions[:num_preguntas]):
-            qa_item = QAItem(
-                pregunta=item["pregunta"],
-                respuesta=item["respuesta"],
+        qa_items = [
+            QAItem(
+                pregunta=q["pregunta"],
+                respuesta=q["respuesta"],
                 categoria=config["categoria"],
                 nivel=config["nivel"],
-                tema=item["tema"],
+                tema=q["tema"],
                 idioma=config["idioma"],
                 confianza=0.85,
-                metadatos={
-                    "modo": "demo",
-                    "generado": "sistema_demo"
-                }
+                metadatos=_DEMO_META
             )
-            qa_items.append(qa_item)
-        
+            for q in _DEMO_QUESTIONS[:num_preguntas]
+        ]
+
         batch = QABatch(
             items=qa_items,
             origen="manual",
@@ -176,7 +316,7 @@ class SimpleQAGeneratorApp:
                 **config
             }
         )
-        
+
         return batch
     
     def render_prompt_generator(self, config: Dict[str, Any]):
@@ -210,12 +350,26 @@ class SimpleQAGeneratorApp:
                     if config["modelo"] == "demo":
                         # Modo demo
                         batch = self.create_demo_qa(config, num_preguntas)
-                        st.session_state.qa_data.append(batch)
+                        self.append_batch(batch)
                         st.session_state.current_batch = batch
                         st.success(f"✅ Generadas {len(batch.items)} preguntas y respuestas! (Modo Demo)")
                     else:
-                        st.error("Funcionalidad con API requiere configurar las API keys en el archivo .env")
-                        st.info("Para probar sin APIs, usa el modo demo automático.")
+                        # Generación real: el generador reparte los lotes
+                        # grandes en llamadas concurrentes, y el wrapper
+                        # cachea respuestas para peticiones idénticas
+                        batch = generate_qa_cached(
+                            config["modelo"],
+                            config["categoria"],
+                            config["nivel"],
+                            config["idioma"],
+                            prompt_text,
+                            num_preguntas,
+                            usar_busqueda
+                        )
+
+                        self.append_batch(batch)
+                        st.session_state.current_batch = batch
+                        st.success(f"✅ Generadas {len(batch.items)} preguntas y respuestas!")
                     
                 except Exception as e:
                     st.error(f"Error generando Q&A: {str(e)}")
@@ -254,7 +408,7 @@ class SimpleQAGeneratorApp:
                             parametros_generacion={"entrada": "manual"}
                         )
                         
-                        st.session_state.qa_data.append(batch)
+                        self.append_batch(batch)
                         st.success("✅ Q&A agregado exitosamente!")
                         st.rerun()
                         
@@ -268,33 +422,45 @@ class SimpleQAGeneratorApp:
             st.write("• El tema es opcional pero recomendado")
             st.write("• Se asignará máxima confianza (1.0)")
     
+    def get_all_items(self) -> List[QAItem]:
+        """Vista plana de todos los items, reconstruida solo si los datos cambian"""
+        fingerprint = data_fingerprint(st.session_state.qa_data)
+        if st.session_state.get("all_items_fingerprint") != fingerprint:
+            st.session_state.all_items_cache = [
+                item for batch in st.session_state.qa_data for item in batch.items
+            ]
+            st.session_state.all_items_fingerprint = fingerprint
+        return st.session_state.all_items_cache
+
     def render_qa_viewer(self):
         """Renderizar visualizador de Q&A"""
         if not st.session_state.qa_data:
             st.info("👆 Genera algunos Q&A usando las opciones de arriba para visualizarlos aquí.")
             return
-        
+
         st.header("📋 Visualización de Q&A Generados")
-        
+
+        # Vista plana compartida por las pestañas de exploración y estadísticas
+        all_items = self.get_all_items()
+
         # Tabs para diferentes vistas
         tab1, tab2, tab3 = st.tabs(["🔍 Explorar", "📊 Estadísticas", "⚙️ Gestión"])
-        
+
         with tab1:
-            self.render_qa_explorer()
-        
+            self.render_qa_explorer(all_items)
+
         with tab2:
-            self.render_statistics()
-        
+            self.render_statistics(all_items)
+
         with tab3:
             self.render_data_management()
-    
-    def render_qa_explorer(self):
-        """Renderizar explorador de Q&A"""
-        # Combinar todos los items
-        all_items = []
-        for batch in st.session_state.qa_data:
-            all_items.extend(batch.items)
-        
+
+    @st.fragment
+    def render_qa_explorer(self, all_items: List[QAItem]):
+        """Renderizar explorador de Q&A
+
+        Fragmento aislado: filtrar o buscar solo re-ejecuta esta sección.
+        """
         if not all_items:
             return
         
@@ -302,29 +468,60 @@ class SimpleQAGeneratorApp:
         col1, col2 = st.columns(2)
         
         with col1:
-            categorias = list(set(item.categoria for item in all_items))
+            # dict.fromkeys deduplica en un solo paso preservando el orden
+            categorias = list(dict.fromkeys(item.categoria for item in all_items))
             categoria_filter = st.selectbox("Filtrar por categoría", ["Todas"] + categorias)
         
         with col2:
             busqueda = st.text_input("Buscar en preguntas/respuestas")
         
-        # Aplicar filtros
-        filtered_items = all_items.copy()
-        
+        # Filtrado vectorizado sobre la vista columnar cacheada: máscaras
+        # booleanas de NumPy en lugar de comprensiones por item
+        import numpy as np
+
+        cols = build_columns(data_fingerprint(st.session_state.qa_data), all_items)
+
+        mask = np.ones(len(all_items), dtype=bool)
+
         if categoria_filter != "Todas":
-            filtered_items = [item for item in filtered_items if item.categoria == categoria_filter]
-        
+            mask &= cols["categoria"] == categoria_filter
+
         if busqueda:
             busqueda_lower = busqueda.lower()
-            filtered_items = [
-                item for item in filtered_items 
-                if busqueda_lower in item.pregunta.lower() or busqueda_lower in item.respuesta.lower()
-            ]
+            mask &= (
+                (np.char.find(cols["pregunta_lower"], busqueda_lower) >= 0)
+                | (np.char.find(cols["respuesta_lower"], busqueda_lower) >= 0)
+            )
+
+        filtered_items = [all_items[i] for i in np.nonzero(mask)[0]]
         
         st.write(f"**Mostrando {len(filtered_items)} de {len(all_items)} elementos**")
-        
-        # Mostrar items
-        for i, item in enumerate(filtered_items):
+
+        # Paginación: renderizar solo una página de expanders mantiene el
+        # rerun del fragmento rápido con miles de elementos
+        page_size = 25
+        total_pages = max(1, -(-len(filtered_items) // page_size))
+        pagina = st.session_state.setdefault("explorer_page", 0)
+        pagina = min(pagina, total_pages - 1)
+
+        if total_pages > 1:
+            col_prev, col_info, col_next = st.columns([1, 2, 1])
+            with col_prev:
+                if st.button("⬅️ Anterior", disabled=pagina == 0):
+                    st.session_state.explorer_page = pagina - 1
+                    st.rerun(scope="fragment")
+            with col_info:
+                st.write(f"Página {pagina + 1} de {total_pages}")
+            with col_next:
+                if st.button("Siguiente ➡️", disabled=pagina >= total_pages - 1):
+                    st.session_state.explorer_page = pagina + 1
+                    st.rerun(scope="fragment")
+
+        inicio = pagina * page_size
+        page_items = filtered_items[inicio:inicio + page_size]
+
+        # Mostrar items de la página actual
+        for i, item in enumerate(page_items, start=inicio):
             with st.expander(f"Q{i+1}: {item.pregunta[:80]}{'...' if len(item.pregunta) > 80 else ''}"):
                 st.markdown(f"**🤔 Pregunta:** {item.pregunta}")
                 st.markdown(f"**💡 Respuesta:** {item.respuesta}")
@@ -337,37 +534,30 @@ class SimpleQAGeneratorApp:
                     st.markdown(f"**🎯 Confianza:** {item.confianza:.2f}")
                     st.markdown(f"**🏷️ Tema:** {item.tema}")
     
-    def render_statistics(self):
-        """Renderizar estadísticas simples"""
-        all_items = []
-        for batch in st.session_state.qa_data:
-            all_items.extend(batch.items)
-        
+    @st.fragment
+    def render_statistics(self, all_items: List[QAItem]):
+        """Renderizar estadísticas simples (fragmento aislado)"""
         if not all_items:
             return
         
+        # Agregaciones vectorizadas sobre el DataFrame cacheado
+        df = items_to_dataframe(data_fingerprint(st.session_state.qa_data), all_items)
+
         # Métricas generales
         col1, col2, col3, col4 = st.columns(4)
-        
+
         with col1:
-            st.metric("Total Q&A", len(all_items))
+            st.metric("Total Q&A", len(df))
         with col2:
             st.metric("Batches", len(st.session_state.qa_data))
         with col3:
-            avg_confidence = sum(item.confianza for item in all_items) / len(all_items)
-            st.metric("Confianza Promedio", f"{avg_confidence:.2f}")
+            st.metric("Confianza Promedio", f"{df['confianza'].mean():.2f}")
         with col4:
-            categorias_unicas = len(set(item.categoria for item in all_items))
-            st.metric("Categorías Únicas", categorias_unicas)
-        
+            st.metric("Categorías Únicas", df["categoria"].nunique())
+
         # Distribuciones simples
         st.subheader("Distribución por Categoría")
-        categoria_counts = {}
-        for item in all_items:
-            categoria_counts[item.categoria] = categoria_counts.get(item.categoria, 0) + 1
-        
-        df_cat = pd.DataFrame(list(categoria_counts.items()), columns=['Categoría', 'Cantidad'])
-        st.bar_chart(df_cat.set_index('Categoría'))
+        st.bar_chart(df["categoria"].value_counts())
     
     def render_data_management(self):
         """Renderizar gestión de datos"""
@@ -381,6 +571,9 @@ class SimpleQAGeneratorApp:
             if st.button("🗑️ Limpiar Todo", type="secondary"):
                 st.session_state.qa_data = []
                 st.session_state.current_batch = None
+                st.session_state.total_items = 0
+                self.data_manager.unifier.clear()
+                self._snapshot_path.unlink(missing_ok=True)
                 st.success("Datos limpiados")
                 st.rerun()
         
@@ -413,41 +606,35 @@ class SimpleQAGeneratorApp:
         
         with col2:
             st.write("**Vista previa:**")
-            total_items = sum(len(batch.items) for batch in st.session_state.qa_data)
-            st.metric("Items a exportar", total_items)
+            st.metric("Items a exportar", st.session_state.total_items)
             st.write(f"**Formato:** {formato.upper()}")
         
         if st.button("📤 Exportar Datos", type="primary"):
             with st.spinner("Exportando datos..."):
                 try:
-                    # Preparar data manager
-                    temp_manager = QADataManager()
-                    for batch in st.session_state.qa_data:
-                        temp_manager.add_data(batch)
-                    
+                    # Preparar data manager (solo los batches nuevos)
+                    self.sync_data_manager()
+
                     # Configurar exportación
                     export_config = ExportConfig(
                         formato=formato,
                         incluir_metadatos=True,
                         nombre_archivo=nombre_archivo if nombre_archivo else None
                     )
-                    
-                    # Exportar
-                    output_path = temp_manager.process_and_export(export_config)
-                    
+
+                    # Exportar (recibiendo los bytes para la descarga sin relectura)
+                    output_path, export_bytes = self.data_manager.process_and_export(
+                        export_config, return_bytes=True
+                    )
+
                     st.success(f"✅ Datos exportados exitosamente: `{output_path}`")
-                    
-                    # Mostrar contenido del archivo exportado
-                    if os.path.exists(output_path):
-                        with open(output_path, "r", encoding="utf-8") as f:
-                            content = f.read()
-                        
-                        st.download_button(
-                            label="⬇️ Descargar archivo",
-                            data=content,
-                            file_name=os.path.basename(output_path),
-                            mime="text/plain" if formato == "csv" else "application/json"
-                        )
+
+                    st.download_button(
+                        label="⬇️ Descargar archivo",
+                        data=export_bytes,
+                        file_name=os.path.basename(output_path),
+                        mime="text/csv" if formato == "csv" else "application/json"
+                    )
                     
                 except Exception as e:
                     st.error(f"Error exportando datos: {str(e)}")
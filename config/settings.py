@@ -35,8 +35,12 @@ class Settings:
     
     # Configuraciones de aplicación
     MAX_QUESTIONS_PER_BATCH = int(os.getenv("MAX_QUESTIONS_PER_BATCH", "50"))
+    # Llamadas simultáneas al LLM al procesar chunks de documentos
+    LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "8"))
     MAX_DOCUMENT_SIZE_MB = int(os.getenv("MAX_DOCUMENT_SIZE_MB", "10"))
-    SUPPORTED_LANGUAGES = os.getenv("SUPPORTED_LANGUAGES", "es,en").split(",")
+    # frozenset: las consultas de pertenencia ("es" in SUPPORTED_LANGUAGES)
+    # son O(1) y el conjunto es inmutable
+    SUPPORTED_LANGUAGES = frozenset(os.getenv("SUPPORTED_LANGUAGES", "es,en").split(","))
     DEFAULT_LANGUAGE = os.getenv("DEFAULT_LANGUAGE", "es")
     
     # Configuración de salida
@@ -86,15 +90,20 @@ class Settings:
         for directory in [cls.DATA_DIR, cls.DOCUMENTS_DIR, cls.OUTPUT_DIR, cls.LOGS_DIR]:
             directory.mkdir(parents=True, exist_ok=True)
     
+    # Las keys se leen del entorno una sola vez al importar el módulo,
+    # así que el estado puede precomputarse en lugar de reconstruir el
+    # dict en cada llamada
+    _API_STATUS = {
+        "openai": bool(OPENAI_API_KEY),
+        "anthropic": bool(ANTHROPIC_API_KEY),
+        "google": bool(GOOGLE_API_KEY),
+        "perplexity": bool(PERPLEXITY_API_KEY)
+    }
+
     @classmethod
     def validate_api_keys(cls) -> Dict[str, bool]:
         """Validar que las API keys estén configuradas"""
-        return {
-            "openai": bool(cls.OPENAI_API_KEY),
-            "anthropic": bool(cls.ANTHROPIC_API_KEY),
-            "google": bool(cls.GOOGLE_API_KEY),
-            "perplexity": bool(cls.PERPLEXITY_API_KEY)
-        }
+        return cls._API_STATUS
 
 # Instancia global de configuración
 settings = Settings()
@@ -5,20 +5,19 @@ Demuestra características avanzadas como filtrado, personalización y batch pro
 
 import asyncio
 import sys
-from pathlib import Path
 from typing import List
 
-# Agregar ruta del proyecto
-sys.path.insert(0, str(Path(__file__).parent.parent))
-
 from src.utils.data_models import QAItem, QABatch, GenerationRequest, ExportConfig
-from src.generators.prompt_generator import PromptQAGenerator
 from src.unifiers.data_unifier import QADataManager
 
 async def ejemplo_generacion_multiple_temas():
     """Ejemplo de generación de Q&A para múltiples temas"""
     print("🎯 Ejemplo Avanzado: Generación Multi-Tema")
-    
+
+    # Import diferido: los SDKs de los proveedores solo se cargan si
+    # este ejemplo (el único que llama a APIs) llega a ejecutarse
+    from src.generators.prompt_generator import PromptQAGenerator
+
     generator = PromptQAGenerator()
     temas = [
         {"prompt": "Inteligencia Artificial en educación", "categoria": "educacion"},
@@ -27,12 +26,8 @@ async def ejemplo_generacion_multiple_temas():
         {"prompt": "Energías renovables", "categoria": "energia"}
     ]
     
-    batches = []
-    
-    for tema in temas:
-        print(f"  🔄 Generando Q&A para: {tema['prompt']}")
-        
-        request = GenerationRequest(
+    requests = [
+        GenerationRequest(
             tipo="prompt",
             prompt=tema["prompt"],
             categoria=tema["categoria"],
@@ -42,14 +37,34 @@ async def ejemplo_generacion_multiple_temas():
             idioma="es",
             usar_busqueda_avanzada=False
         )
-        
+        for tema in temas
+    ]
+
+    for tema in temas:
+        print(f"  🔄 Generando Q&A para: {tema['prompt']}")
+
+    async def generar(tema, request):
         try:
-            batch = await generator.generate_qa_batch(request)
-            batches.append(batch)
-            print(f"    ✅ {len(batch.items)} Q&A generados")
+            return tema, await generator.generate_qa_batch(request), None
         except Exception as e:
-            print(f"    ❌ Error: {e}")
-    
+            return tema, None, e
+
+    # Las llamadas son independientes y están limitadas por I/O:
+    # as_completed las ejecuta en paralelo y entrega cada resultado en
+    # cuanto llega, sin esperar a la llamada más lenta para reportar
+    batches = []
+    completadas = 0
+    corrutinas = [generar(tema, request) for tema, request in zip(temas, requests)]
+
+    for futuro in asyncio.as_completed(corrutinas):
+        tema, batch, error = await futuro
+        completadas += 1
+        if error is not None:
+            print(f"    ❌ [{completadas}/{len(temas)}] Error en '{tema['prompt']}': {error}")
+        else:
+            batches.append(batch)
+            print(f"    ✅ [{completadas}/{len(temas)}] {len(batch.items)} Q&A para '{tema['prompt']}'")
+
     return batches
 
 def ejemplo_filtrado_avanzado(batches: List[QABatch]):
@@ -61,7 +76,7 @@ def ejemplo_filtrado_avanzado(batches: List[QABatch]):
     for batch in batches:
         manager.add_data(batch)
     
-    total_items = len(manager.unifier.unified_items)
+    total_items = len(manager.unifier)
     print(f"📊 Total items antes del filtrado: {total_items}")
     
     # Filtro 1: Solo categoría "educacion"
@@ -102,64 +117,64 @@ def ejemplo_estadisticas_detalladas(manager: QADataManager):
     print(f"  - Longitud promedio pregunta: {stats['longitud_pregunta_promedio']:.1f} caracteres")
     print(f"  - Longitud promedio respuesta: {stats['longitud_respuesta_promedio']:.1f} caracteres")
     
-    print(f"\n🏷️ Distribución por Categorías:")
-    for categoria, count in stats['distribucion_categorias'].items():
-        porcentaje = (count / stats['total_items']) * 100
-        print(f"  - {categoria}: {count} ({porcentaje:.1f}%)")
-    
-    print(f"\n📊 Distribución por Niveles:")
-    for nivel, count in stats['distribucion_niveles'].items():
-        porcentaje = (count / stats['total_items']) * 100
-        print(f"  - {nivel}: {count} ({porcentaje:.1f}%)")
-    
-    print(f"\n🌍 Distribución por Idiomas:")
-    for idioma, count in stats['distribucion_idiomas'].items():
-        print(f"  - {idioma}: {count}")
+    # Acumular las líneas y emitirlas en una sola escritura: un syscall
+    # por bloque en vez de uno por categoría
+    total = stats['total_items']
+
+    lines = ["\n🏷️ Distribución por Categorías:"]
+    lines += [
+        f"  - {categoria}: {count} ({count / total * 100:.1f}%)"
+        for categoria, count in stats['distribucion_categorias'].items()
+    ]
+
+    lines.append("\n📊 Distribución por Niveles:")
+    lines += [
+        f"  - {nivel}: {count} ({count / total * 100:.1f}%)"
+        for nivel, count in stats['distribucion_niveles'].items()
+    ]
+
+    lines.append("\n🌍 Distribución por Idiomas:")
+    lines += [
+        f"  - {idioma}: {count}"
+        for idioma, count in stats['distribucion_idiomas'].items()
+    ]
+
+    sys.stdout.write("\n".join(lines) + "\n")
 
 def ejemplo_exportacion_personalizada(manager: QADataManager):
     """Ejemplo de exportación con configuraciones personalizadas"""
     print("\n💾 Ejemplo Avanzado: Exportación Personalizada")
     
-    # Exportación 1: Solo datos de alta confianza en CSV
-    config_premium = ExportConfig(
-        formato="csv",
-        incluir_metadatos=True,
-        filtros={"confianza_minima": 0.85},
-        nombre_archivo="qa_premium_quality"
-    )
-    
-    try:
-        output_premium = manager.process_and_export(config_premium)
-        print(f"  ⭐ Exportado CSV premium: {output_premium}")
-    except Exception as e:
-        print(f"  ❌ Error en exportación premium: {e}")
-    
-    # Exportación 2: Datos de educación en JSON
-    config_educacion = ExportConfig(
-        formato="json",
-        incluir_metadatos=True,
-        filtros={"categoria": "educacion"},
-        nombre_archivo="qa_educacion_especializado"
-    )
-    
-    try:
-        output_educacion = manager.process_and_export(config_educacion)
-        print(f"  🎓 Exportado JSON educación: {output_educacion}")
-    except Exception as e:
-        print(f"  ❌ Error en exportación educación: {e}")
-    
-    # Exportación 3: Resumen en Excel con múltiples hojas
-    config_excel = ExportConfig(
-        formato="xlsx",
-        incluir_metadatos=True,
-        nombre_archivo="qa_reporte_completo"
-    )
-    
+    configs = [
+        # Exportación 1: Solo datos de alta confianza en CSV
+        ExportConfig(
+            formato="csv",
+            incluir_metadatos=True,
+            filtros={"confianza_minima": 0.85},
+            nombre_archivo="qa_premium_quality"
+        ),
+        # Exportación 2: Datos de educación en JSON
+        ExportConfig(
+            formato="json",
+            incluir_metadatos=True,
+            filtros={"categoria": "educacion"},
+            nombre_archivo="qa_educacion_especializado"
+        ),
+        # Exportación 3: Resumen en Excel con múltiples hojas
+        ExportConfig(
+            formato="xlsx",
+            incluir_metadatos=True,
+            nombre_archivo="qa_reporte_completo"
+        )
+    ]
+
+    # Una sola llamada: la deduplicación se paga una vez para las tres
     try:
-        output_excel = manager.process_and_export(config_excel)
-        print(f"  📊 Exportado Excel completo: {output_excel}")
+        outputs = manager.process_and_export_many(configs)
+        for output in outputs:
+            print(f"  💾 Exportado: {output}")
     except Exception as e:
-        print(f"  ❌ Error en exportación Excel: {e}")
+        print(f"  ❌ Error en exportación múltiple: {e}")
 
 def ejemplo_qa_personalizado():
     """Ejemplo de creación manual de Q&A"""
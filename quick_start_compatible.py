@@ -49,8 +49,9 @@ def configurar_env():
         print("[INFO] Archivo .env no encontrado. Copiando desde .env.example...")
         example_file = Path(".env.example")
         if example_file.exists():
-            import shutil
-            shutil.copy(example_file, env_file)
+            # Lectura/escritura directa: el archivo es diminuto y no hace
+            # falta la copia en bloques ni el chmod de shutil.copy
+            env_file.write_bytes(example_file.read_bytes())
             print("[OK] Archivo .env creado")
         else:
             print("[ERROR] .env.example no encontrado")
@@ -61,10 +62,7 @@ def configurar_env():
 async def demo_rapida():
     """Ejecutar una demostración rápida del sistema"""
     print("\n[INFO] Demo Rapida del Sistema...")
-    
-    # Agregar ruta del proyecto
-    sys.path.insert(0, str(Path(__file__).parent))
-    
+
     try:
         from src.utils.data_models import QAItem, QABatch
         print("[OK] Modulos importados correctamente")
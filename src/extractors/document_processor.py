@@ -3,15 +3,27 @@ Procesador de documentos para extracción automática de Q&A
 Soporta PDF, DOCX, TXT y otros formatos comunes
 """
 
+import asyncio
 import os
 import re
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Union
-from abc import ABC, abstractmethod
+from typing import Callable, List, Dict, Any, Optional, Union
 
-import PyPDF2
+# pypdf es el sucesor mantenido de PyPDF2; la API de lectura es la misma
+try:
+    from pypdf import PdfReader as _PdfReader
+except ImportError:
+    from PyPDF2 import PdfReader as _PdfReader
 from docx import Document
 import nltk
+
+# Detector de encoding opcional: si está instalado se decodifica a la
+# primera en lugar de probar encodings por ensayo y error
+try:
+    import charset_normalizer
+except ImportError:
+    charset_normalizer = None
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.schema import Document as LangchainDocument
 
@@ -29,105 +41,147 @@ try:
 except:
     logger.warning("No se pudieron descargar recursos de NLTK")
 
-class DocumentReader(ABC):
-    """Clase base para lectores de documentos"""
-    
-    @abstractmethod
-    def read(self, file_path: str) -> str:
-        """Leer documento y retornar texto"""
-        pass
-    
-    @abstractmethod
-    def get_supported_extensions(self) -> List[str]:
-        """Obtener extensiones soportadas"""
-        pass
+# Lectores como funciones a nivel de módulo: son stateless, así que no
+# hay nada que justifique una clase por formato, y al ser picklables se
+# pueden despachar directamente a otros procesos
 
-class PDFReader(DocumentReader):
-    """Lector de archivos PDF"""
-    
-    def read(self, file_path: str) -> str:
-        """Leer archivo PDF"""
-        try:
-            text = ""
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
-            return text
-        except Exception as e:
-            logger.error(f"Error leyendo PDF {file_path}: {e}")
-            raise
-    
-    def get_supported_extensions(self) -> List[str]:
-        return ['.pdf']
+# Umbral a partir del cual compensa repartir páginas entre procesos
+# (la extracción de texto del PDF es trabajo de CPU por página)
+MIN_PAGINAS_PARALELO = 8
 
-class DOCXReader(DocumentReader):
-    """Lector de archivos DOCX"""
-    
-    def read(self, file_path: str) -> str:
-        """Leer archivo DOCX"""
-        try:
-            doc = Document(file_path)
-            text = ""
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-            return text
-        except Exception as e:
-            logger.error(f"Error leyendo DOCX {file_path}: {e}")
-            raise
-    
-    def get_supported_extensions(self) -> List[str]:
-        return ['.docx', '.doc']
+def _extract_pdf_pages(file_path: str, start: int, stop: int) -> List[str]:
+    """Extraer el texto de un rango de páginas
 
-class TXTReader(DocumentReader):
-    """Lector de archivos de texto plano"""
-    
-    def read(self, file_path: str) -> str:
-        """Leer archivo de texto"""
-        try:
-            encodings = ['utf-8', 'latin-1', 'cp1252']
-            for encoding in encodings:
-                try:
-                    with open(file_path, 'r', encoding=encoding) as file:
-                        return file.read()
-                except UnicodeDecodeError:
-                    continue
-            raise ValueError(f"No se pudo decodificar el archivo {file_path}")
-        except Exception as e:
-            logger.error(f"Error leyendo TXT {file_path}: {e}")
-            raise
-    
-    def get_supported_extensions(self) -> List[str]:
-        return ['.txt', '.md', '.rtf']
+    Función a nivel de módulo para que sea picklable: cada worker abre
+    su propio lector y no comparte estado con el proceso principal.
+    """
+    pdf_reader = _PdfReader(file_path)
+    return [pdf_reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+def _read_pdf_parallel(file_path: str, num_pages: int) -> List[str]:
+    """Extraer páginas repartidas en rangos entre procesos"""
+    from concurrent.futures import ProcessPoolExecutor
+
+    workers = min(os.cpu_count() or 1, num_pages)
+    paso = -(-num_pages // workers)
+    rangos = [(inicio, min(inicio + paso, num_pages)) for inicio in range(0, num_pages, paso)]
+
+    parts: List[str] = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(_extract_pdf_pages, file_path, inicio, fin)
+            for inicio, fin in rangos
+        ]
+        for future in futures:
+            parts.extend(future.result())
+
+    return parts
+
+def read_pdf(file_path: str) -> str:
+    """Leer archivo PDF"""
+    try:
+        with open(file_path, 'rb') as file:
+            pdf_reader = _PdfReader(file)
+            num_pages = len(pdf_reader.pages)
+
+            if num_pages < MIN_PAGINAS_PARALELO:
+                parts = [page.extract_text() or "" for page in pdf_reader.pages]
+                return "\n".join(parts) + "\n"
+
+        parts = _read_pdf_parallel(file_path, num_pages)
+        return "\n".join(parts) + "\n"
+    except Exception as e:
+        logger.error(f"Error leyendo PDF {file_path}: {e}")
+        raise
+
+def iter_pdf_pages(file_path: str):
+    """Generar el texto del PDF página a página
+
+    Permite consumir documentos grandes sin materializar el texto
+    completo cuando el llamador puede procesar por página.
+    """
+    with open(file_path, 'rb') as file:
+        pdf_reader = _PdfReader(file)
+        for page in pdf_reader.pages:
+            yield page.extract_text() or ""
+
+def read_docx(file_path: str) -> str:
+    """Leer archivo DOCX"""
+    try:
+        doc = Document(file_path)
+        # Acumular y unir una sola vez: el += por párrafo copiaba el
+        # texto completo en cada iteración (coste cuadrático)
+        parts = [paragraph.text for paragraph in doc.paragraphs]
+        return "\n".join(parts) + "\n"
+    except Exception as e:
+        logger.error(f"Error leyendo DOCX {file_path}: {e}")
+        raise
+
+def read_txt(file_path: str) -> str:
+    """Leer archivo de texto"""
+    try:
+        # Una sola lectura binaria; los intentos de decodificación
+        # ocurren en memoria en lugar de releer el archivo por encoding
+        raw = Path(file_path).read_bytes()
+
+        if charset_normalizer is not None:
+            best = charset_normalizer.from_bytes(raw[:65536]).best()
+            if best is not None and best.encoding:
+                return raw.decode(best.encoding, errors='replace')
+
+        for encoding in ['utf-8', 'latin-1', 'cp1252']:
+            try:
+                return raw.decode(encoding)
+            except UnicodeDecodeError:
+                continue
+        raise ValueError(f"No se pudo decodificar el archivo {file_path}")
+    except Exception as e:
+        logger.error(f"Error leyendo TXT {file_path}: {e}")
+        raise
+
+# Despacho por extensión
+READERS: Dict[str, Callable[[str], str]] = {
+    '.pdf': read_pdf,
+    '.docx': read_docx,
+    '.doc': read_docx,
+    '.txt': read_txt,
+    '.md': read_txt,
+    '.rtf': read_txt
+}
+
+@lru_cache(maxsize=8)
+def _get_text_splitter(chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSplitter:
+    """Splitter compartido por configuración: es stateless entre llamadas,
+    así que los chunkers con los mismos parámetros reutilizan la instancia"""
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=len,
+        separators=["\n\n", "\n", ".", "!", "?", ";", ":", " ", ""]
+    )
 
 class DocumentChunker:
     """Segmentador de texto en chunks para procesamiento"""
-    
+
     def __init__(self, chunk_size: int = None, chunk_overlap: int = None):
         self.chunk_size = chunk_size or settings.CHUNK_SIZE
         self.chunk_overlap = chunk_overlap or settings.CHUNK_OVERLAP
-        
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=self.chunk_size,
-            chunk_overlap=self.chunk_overlap,
-            length_function=len,
-            separators=["\n\n", "\n", ".", "!", "?", ";", ":", " ", ""]
-        )
+        self.text_splitter = _get_text_splitter(self.chunk_size, self.chunk_overlap)
     
     def chunk_text(self, text: str, metadata: Dict[str, Any] = None) -> List[LangchainDocument]:
         """Dividir texto en chunks"""
         try:
             chunks = self.text_splitter.split_text(text)
             documents = []
-            
+
+            # Metadatos comunes resueltos una sola vez fuera del bucle;
+            # cada chunk solo aporta sus dos claves propias
+            base_metadata = metadata or {}
             for i, chunk in enumerate(chunks):
-                doc_metadata = {
-                    "chunk_index": i,
-                    "chunk_size": len(chunk),
-                    **(metadata or {})
-                }
+                doc_metadata = {"chunk_index": i, "chunk_size": len(chunk)}
+                doc_metadata.update(base_metadata)
                 documents.append(LangchainDocument(page_content=chunk, metadata=doc_metadata))
-            
+
             logger.info(f"Texto dividido en {len(documents)} chunks")
             return documents
         except Exception as e:
@@ -140,33 +194,88 @@ class QAExtractor:
     def __init__(self):
         self.prompt_generator = PromptQAGenerator()
     
+    # Un único patrón de marcadores en lugar de los cuatro regex lazy con
+    # DOTALL anteriores: localizar marcadores es lineal y sin riesgo de
+    # backtracking; el texto entre marcadores se rebana directamente
+    MARKER_RE = re.compile(
+        r'(?:(?m:^)[ \t]*(?:'
+        r'(?P<resp>(?:Respuesta|R|A)[:\-])'
+        r'|(?P<preg>(?:Pregunta|P|Q)[:\-]|\d+\.)'
+        r'))|(?P<inv>¿)',
+        re.IGNORECASE
+    )
+
     def extract_existing_qa(self, text: str) -> List[Dict[str, str]]:
         """Extraer Q&A que ya existen en el texto (si los hay)"""
+        # Atajo: el filtro final exige "?" en la pregunta, así que un
+        # texto sin interrogaciones no puede producir ningún par; evita
+        # el escaneo de marcadores en documentos narrativos largos
+        if '?' not in text:
+            return []
+
         qa_pairs = []
-        
-        # Patrones para identificar Q&A existentes
-        patterns = [
-            r'P(?:regunta)?[:\-\s]*(.+?)\s*R(?:espuesta)?[:\-\s]*(.+?)(?=P(?:regunta)?[:\-\s]|$)',
-            r'Q[:\-\s]*(.+?)\s*A[:\-\s]*(.+?)(?=Q[:\-\s]|$)',
-            r'(\d+\.\s*.+?\?)\s*(.+?)(?=\d+\.|$)',
-            r'¿(.+?\?)\s*(.+?)(?=¿|$)'
-        ]
-        
-        for pattern in patterns:
-            matches = re.findall(pattern, text, re.DOTALL | re.IGNORECASE)
-            for question, answer in matches:
-                qa_pairs.append({
-                    "pregunta": question.strip(),
-                    "respuesta": answer.strip()
-                })
-        
+
+        markers = list(self.MARKER_RE.finditer(text))
+        i = 0
+        while i < len(markers):
+            marker = markers[i]
+            # Una respuesta sin pregunta previa no forma un par
+            if marker.group('resp'):
+                i += 1
+                continue
+
+            inicio = marker.end()
+            siguiente = i + 1
+
+            # Un "¿" inmediatamente después de "Pregunta:"/"1." abre la
+            # pregunta: se absorbe como parte del texto (tratarlo como
+            # marcador propio recortaba el "¿" inicial de la pregunta)
+            if (marker.group('preg') and siguiente < len(markers)
+                    and markers[siguiente].group('inv')
+                    and not text[inicio:markers[siguiente].start()].strip()):
+                inicio = markers[siguiente].start()
+                siguiente += 1
+
+            fin = markers[siguiente].start() if siguiente < len(markers) else len(text)
+
+            if siguiente < len(markers) and markers[siguiente].group('resp'):
+                # Par explícito pregunta/respuesta: la respuesta llega
+                # hasta el siguiente marcador
+                question = text[inicio:fin]
+                ans_inicio = markers[siguiente].end()
+                ans_fin = (
+                    markers[siguiente + 1].start()
+                    if siguiente + 1 < len(markers) else len(text)
+                )
+                answer = text[ans_inicio:ans_fin]
+                i = siguiente + 1
+            else:
+                # Sin marcador de respuesta (listas numeradas, ¿...?):
+                # la pregunta termina en el primer '?' y el resto del
+                # segmento es la respuesta
+                segment = text[inicio:fin]
+                pos = segment.find('?')
+                if pos == -1:
+                    i = siguiente
+                    continue
+                question = segment[:pos + 1]
+                answer = segment[pos + 1:]
+                i = siguiente
+
+            qa_pairs.append({
+                "pregunta": question.strip(),
+                "respuesta": answer.strip()
+            })
+
         # Filtrar duplicados y validar calidad
         filtered_pairs = []
         seen_questions = set()
         
         for qa in qa_pairs:
-            question = qa["pregunta"].lower()
-            if (question not in seen_questions and 
+            # Clave normalizada: mismo texto con distinto espaciado o
+            # mayúsculas cuenta como duplicado
+            question = re.sub(r'\s+', ' ', qa["pregunta"]).casefold()
+            if (question not in seen_questions and
                 len(qa["pregunta"]) > 10 and 
                 len(qa["respuesta"]) > 20 and
                 "?" in qa["pregunta"]):
@@ -175,36 +284,49 @@ class QAExtractor:
         
         return filtered_pairs
     
-    async def generate_qa_from_chunk(
-        self,
-        chunk: LangchainDocument,
-        categoria: str = "general",
-        nivel: str = "intermedio",
-        num_preguntas: int = 5,
-        modelo: str = "openai"
-    ) -> List[QAItem]:
-        """Generar Q&A a partir de un chunk de texto"""
-        
-        # Crear prompt específico para extracción de documentos
-        prompt = f"""
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _chunk_prompt_parts(num_preguntas: int, nivel: str, categoria: str) -> tuple:
+        """Prefijo y sufijo del prompt de chunk (memoizados por parámetros)
+
+        Solo el texto del chunk varía dentro de un documento; el resto del
+        prompt se formatea una vez por combinación de parámetros.
+        """
+        prefix = f"""
         Basándote en el siguiente texto, genera {num_preguntas} preguntas y respuestas específicas y relevantes.
-        
+
         TEXTO:
-        {chunk.page_content}
-        
+        """
+        suffix = f"""
+
         Instrucciones:
         - Las preguntas deben ser respondibles directamente con la información del texto
         - Las respuestas deben ser precisas y basadas únicamente en el contenido proporcionado
         - Incluye preguntas de diferentes tipos: factual, conceptual, y de comprensión
         - Usa un nivel de dificultad: {nivel}
         - Categoría: {categoria}
-        
+
         Formato de respuesta:
         PREGUNTA: [pregunta aquí]
         RESPUESTA: [respuesta aquí]
         ---
         """
-        
+        return prefix, suffix
+
+    async def generate_qa_from_chunk(
+        self,
+        chunk: LangchainDocument,
+        categoria: str = "general",
+        nivel: str = "intermedio",
+        num_preguntas: int = 5,
+        modelo: str = "openai"
+    ) -> List[QAItem]:
+        """Generar Q&A a partir de un chunk de texto"""
+
+        # Crear prompt específico para extracción de documentos
+        prefix, suffix = self._chunk_prompt_parts(num_preguntas, nivel, categoria)
+        prompt = prefix + chunk.page_content + suffix
+
         # Crear request para el generador
         request = GenerationRequest(
             tipo="documento",
@@ -229,27 +351,104 @@ class QAExtractor:
                 "documento_fuente": chunk.metadata.get("source", ""),
                 "metodo_extraccion": "generacion_automatica"
             })
-        
+
+        return qa_items
+
+    # Chunks empaquetados por llamada al LLM: la latencia fija por
+    # request (TTFB) domina en chunks pequeños, así que agruparlos
+    # reduce el número de round-trips en ~este factor
+    CHUNKS_POR_LLAMADA = 5
+
+    # Cabeceras [CHUNK n] con las que el modelo separa las secciones
+    CHUNK_HEADER_RE = re.compile(r'\[CHUNK\s+(\d+)\]', re.IGNORECASE)
+
+    async def generate_qa_from_chunks(
+        self,
+        chunks: List[LangchainDocument],
+        categoria: str = "general",
+        nivel: str = "intermedio",
+        num_preguntas: int = 5,
+        modelo: str = "openai"
+    ) -> List[QAItem]:
+        """Generar Q&A para varios chunks en una sola llamada al LLM"""
+
+        if len(chunks) == 1:
+            return await self.generate_qa_from_chunk(
+                chunks[0], categoria, nivel, num_preguntas, modelo
+            )
+
+        secciones = "\n\n".join(
+            f"[CHUNK {i + 1}]\n{chunk.page_content}"
+            for i, chunk in enumerate(chunks)
+        )
+
+        prompt = f"""
+        Basándote en los siguientes fragmentos de texto, genera {num_preguntas} preguntas y respuestas específicas y relevantes POR CADA fragmento.
+
+        {secciones}
+
+        Instrucciones:
+        - Las preguntas deben ser respondibles directamente con la información de su fragmento
+        - Las respuestas deben ser precisas y basadas únicamente en el contenido proporcionado
+        - Incluye preguntas de diferentes tipos: factual, conceptual, y de comprensión
+        - Usa un nivel de dificultad: {nivel}
+        - Categoría: {categoria}
+        - Repite la cabecera [CHUNK n] antes de los Q&A de cada fragmento
+
+        Formato de respuesta:
+        [CHUNK 1]
+        PREGUNTA: [pregunta aquí]
+        RESPUESTA: [respuesta aquí]
+        ---
+        """
+
+        request = GenerationRequest(
+            tipo="documento",
+            prompt=prompt,
+            categoria=categoria,
+            nivel=nivel,
+            num_preguntas=num_preguntas * len(chunks),
+            modelo=modelo
+        )
+
+        provider = self.prompt_generator.get_provider(modelo)
+        response = await provider.generate_qa(prompt)
+
+        # Enrutar cada sección [CHUNK n] de la respuesta a su chunk: se
+        # parsea con el parser habitual y hereda los metadatos del chunk
+        qa_items: List[QAItem] = []
+        partes = self.CHUNK_HEADER_RE.split(response)
+
+        if len(partes) == 1:
+            # El modelo no repitió las cabeceras: parsear todo junto y
+            # atribuirlo al primer chunk del lote
+            partes = ["", "1", response]
+
+        for j in range(1, len(partes) - 1, 2):
+            indice = int(partes[j]) - 1
+            if not 0 <= indice < len(chunks):
+                continue
+            chunk = chunks[indice]
+            for item in self.prompt_generator.parse_qa_response(partes[j + 1], request):
+                item.metadatos.update({
+                    "fuente_chunk": chunk.metadata.get("chunk_index", 0),
+                    "documento_fuente": chunk.metadata.get("source", ""),
+                    "metodo_extraccion": "generacion_automatica"
+                })
+                qa_items.append(item)
+
         return qa_items
 
 class DocumentQAProcessor:
     """Procesador principal de documentos para generación de Q&A"""
     
     def __init__(self):
-        self.readers = {
-            '.pdf': PDFReader(),
-            '.docx': DOCXReader(),
-            '.doc': DOCXReader(),
-            '.txt': TXTReader(),
-            '.md': TXTReader(),
-            '.rtf': TXTReader()
-        }
         self.chunker = DocumentChunker()
         self.qa_extractor = QAExtractor()
-    
+
     def get_supported_formats(self) -> List[str]:
         """Obtener formatos de archivo soportados"""
-        return list(self.readers.keys())
+        return list(READERS.keys())
     
     def validate_document(self, file_path: str) -> bool:
         """Validar que el documento sea procesable"""
@@ -262,7 +461,7 @@ class DocumentQAProcessor:
                 return False
             
             # Verificar extensión
-            if path.suffix.lower() not in self.readers:
+            if path.suffix.lower() not in READERS:
                 logger.error(f"Formato no soportado: {path.suffix}")
                 return False
             
@@ -282,11 +481,10 @@ class DocumentQAProcessor:
         path = Path(file_path)
         extension = path.suffix.lower()
         
-        if extension not in self.readers:
+        if extension not in READERS:
             raise ValueError(f"Formato no soportado: {extension}")
-        
-        reader = self.readers[extension]
-        return reader.read(file_path)
+
+        return READERS[extension](file_path)
     
     async def process_document(
         self,
@@ -295,7 +493,8 @@ class DocumentQAProcessor:
         nivel: str = "intermedio",
         preguntas_por_chunk: int = 3,
         modelo: str = "openai",
-        extraer_existente: bool = True
+        extraer_existente: bool = True,
+        max_concurrencia: int = None
     ) -> QABatch:
         """Procesar documento completo y generar Q&A"""
         
@@ -305,8 +504,10 @@ class DocumentQAProcessor:
         if not self.validate_document(file_path):
             raise ValueError(f"Documento inválido: {file_path}")
         
-        # Leer contenido
-        text = self.read_document(file_path)
+        # Leer contenido en un thread: la lectura/parseo del archivo es
+        # I/O bloqueante y no debe congelar el event loop si hay varios
+        # documentos en vuelo
+        text = await asyncio.to_thread(self.read_document, file_path)
         logger.info(f"Texto extraído: {len(text)} caracteres")
         
         # Crear metadatos del documento
@@ -339,18 +540,34 @@ class DocumentQAProcessor:
                 )
                 existing_qa.append(qa_item)
         
-        # Generar Q&A de chunks
+        # Generar Q&A de chunks en paralelo (el trabajo está dominado por
+        # la latencia de red, el semáforo limita la concurrencia para
+        # respetar los rate limits del proveedor)
+        semaphore = asyncio.Semaphore(max_concurrencia or settings.LLM_CONCURRENCY)
+
+        # Agrupar chunks por llamada para amortizar la latencia fija de
+        # cada request al proveedor
+        tamano_lote = self.qa_extractor.CHUNKS_POR_LLAMADA
+        lotes = [chunks[i:i + tamano_lote] for i in range(0, len(chunks), tamano_lote)]
+
+        async def process_lote(index: int, lote) -> List[QAItem]:
+            async with semaphore:
+                logger.info(f"Procesando lote {index+1}/{len(lotes)} ({len(lote)} chunks)")
+                try:
+                    return await self.qa_extractor.generate_qa_from_chunks(
+                        lote, categoria, nivel, preguntas_por_chunk, modelo
+                    )
+                except Exception as e:
+                    logger.warning(f"Error procesando lote {index+1}: {e}")
+                    return []
+
+        chunk_results = await asyncio.gather(
+            *(process_lote(i, lote) for i, lote in enumerate(lotes))
+        )
+
         generated_qa = []
-        for i, chunk in enumerate(chunks):
-            logger.info(f"Procesando chunk {i+1}/{len(chunks)}")
-            try:
-                chunk_qa = await self.qa_extractor.generate_qa_from_chunk(
-                    chunk, categoria, nivel, preguntas_por_chunk, modelo
-                )
-                generated_qa.extend(chunk_qa)
-            except Exception as e:
-                logger.warning(f"Error procesando chunk {i+1}: {e}")
-                continue
+        for chunk_qa in chunk_results:
+            generated_qa.extend(chunk_qa)
         
         # Combinar todos los Q&A
         all_qa = existing_qa + generated_qa
@@ -0,0 +1,139 @@
+"""
+Procesador de lotes usando la Batch API de OpenAI
+Pensado para cargas masivas de generación donde la latencia no es crítica
+(la Batch API cuesta la mitad y se resuelve de forma asíncrona)
+"""
+
+import json
+import time
+from io import BytesIO
+from typing import List, Optional
+
+import openai
+
+from config.settings import settings
+from src.utils.logger import get_logger
+from src.utils.data_models import QAItem, QABatch, GenerationRequest
+from src.generators.prompt_generator import PromptQAGenerator
+
+logger = get_logger(__name__)
+
+class BatchProcessor:
+    """Envía generaciones masivas de Q&A a la Batch API de OpenAI"""
+
+    COMPLETION_WINDOW = "24h"
+    ESTADOS_FINALES = {"completed", "failed", "expired", "cancelled"}
+
+    def __init__(self):
+        if not settings.OPENAI_API_KEY:
+            raise ValueError("OPENAI_API_KEY no configurada")
+        self.client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
+        self.prompt_generator = PromptQAGenerator()
+
+    def _build_jsonl(self, request: GenerationRequest) -> bytes:
+        """Construir el JSONL de requests para la Batch API"""
+        lines = []
+        max_por_llamada = self.prompt_generator.MAX_PREGUNTAS_POR_LLAMADA
+        restantes = request.num_preguntas or 10
+
+        indice = 0
+        while restantes > 0:
+            tamano = min(restantes, max_por_llamada)
+            sub_request = request.copy(update={"num_preguntas": tamano})
+            prompt = self.prompt_generator.create_prompt(sub_request)
+
+            lines.append(json.dumps({
+                "custom_id": f"qa-batch-{indice}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": settings.OPENAI_MODEL,
+                    "messages": [
+                        {"role": "system", "content": "Eres un experto generador de preguntas y respuestas educativas."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    "max_tokens": 3000,
+                    "temperature": 0.7
+                }
+            }, ensure_ascii=False))
+
+            restantes -= tamano
+            indice += 1
+
+        return "\n".join(lines).encode("utf-8")
+
+    def submit_batch(self, request: GenerationRequest) -> str:
+        """Subir el lote y crear el job. Retorna el ID del batch"""
+        jsonl_bytes = self._build_jsonl(request)
+
+        input_file = self.client.files.create(
+            file=BytesIO(jsonl_bytes),
+            purpose="batch"
+        )
+
+        batch_job = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window=self.COMPLETION_WINDOW
+        )
+
+        logger.info(f"Batch job creado: {batch_job.id}")
+        return batch_job.id
+
+    def get_status(self, batch_id: str) -> str:
+        """Obtener el estado actual del job"""
+        return self.client.batches.retrieve(batch_id).status
+
+    def collect_results(self, batch_id: str, request: GenerationRequest) -> Optional[QABatch]:
+        """Recoger los resultados de un job completado y construir el QABatch"""
+        batch_job = self.client.batches.retrieve(batch_id)
+
+        if batch_job.status != "completed":
+            logger.warning(f"Batch {batch_id} no completado (estado: {batch_job.status})")
+            return None
+
+        output = self.client.files.content(batch_job.output_file_id)
+
+        qa_items: List[QAItem] = []
+        for line in output.text.splitlines():
+            if not line.strip():
+                continue
+            try:
+                result = json.loads(line)
+                content = result["response"]["body"]["choices"][0]["message"]["content"]
+                qa_items.extend(self.prompt_generator.parse_qa_response(content, request))
+            except (KeyError, json.JSONDecodeError) as e:
+                logger.warning(f"Resultado de batch no parseable: {e}")
+                continue
+
+        batch = QABatch(
+            items=qa_items,
+            origen="api",
+            prompt_original=request.prompt,
+            parametros_generacion={**request.dict(), "batch_job_id": batch_id}
+        )
+        batch.estadisticas = batch.get_stats()
+
+        logger.info(f"Batch {batch_id} recogido: {len(qa_items)} elementos")
+        return batch
+
+    def wait_for_batch(
+        self,
+        batch_id: str,
+        request: GenerationRequest,
+        poll_interval: int = 30,
+        timeout: Optional[int] = None
+    ) -> Optional[QABatch]:
+        """Esperar a que el job termine y recoger los resultados"""
+        inicio = time.monotonic()
+
+        while True:
+            status = self.get_status(batch_id)
+            if status in self.ESTADOS_FINALES:
+                break
+            if timeout and time.monotonic() - inicio > timeout:
+                logger.warning(f"Timeout esperando batch {batch_id}")
+                return None
+            time.sleep(poll_interval)
+
+        return self.collect_results(batch_id, request)
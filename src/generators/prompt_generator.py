@@ -5,13 +5,15 @@ Soporta múltiples proveedores de LLM y búsqueda avanzada
 
 import asyncio
 import re
+import time
+from functools import lru_cache
 from typing import List, Dict, Any, Optional
 from abc import ABC, abstractmethod
 
 import openai
 import anthropic
 import google.generativeai as genai
-import requests
+import httpx
 
 from config.settings import settings
 from src.utils.logger import get_logger
@@ -34,16 +36,18 @@ class OpenAIProvider(LLMProvider):
         if not settings.OPENAI_API_KEY:
             raise ValueError("OPENAI_API_KEY no configurada")
         openai.api_key = settings.OPENAI_API_KEY
-        self.client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
-    
+        # Cliente async nativo: las llamadas concurrentes comparten el
+        # event loop sin pasar por threads
+        self.client = openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+
     async def generate_qa(self, prompt: str, **kwargs) -> str:
         """Generar Q&A usando OpenAI"""
         try:
             model = kwargs.get('model', settings.OPENAI_MODEL)
             max_tokens = kwargs.get('max_tokens', 3000)
             temperature = kwargs.get('temperature', 0.7)
-            
-            response = self.client.chat.completions.create(
+
+            response = await self.client.chat.completions.create(
                 model=model,
                 messages=[
                     {"role": "system", "content": "Eres un experto generador de preguntas y respuestas educativas."},
@@ -64,7 +68,7 @@ class AnthropicProvider(LLMProvider):
     def __init__(self):
         if not settings.ANTHROPIC_API_KEY:
             raise ValueError("ANTHROPIC_API_KEY no configurada")
-        self.client = anthropic.Anthropic(api_key=settings.ANTHROPIC_API_KEY)
+        self.client = anthropic.AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY)
     
     async def generate_qa(self, prompt: str, **kwargs) -> str:
         """Generar Q&A usando Anthropic"""
@@ -73,7 +77,7 @@ class AnthropicProvider(LLMProvider):
             max_tokens = kwargs.get('max_tokens', 3000)
             temperature = kwargs.get('temperature', 0.7)
             
-            response = self.client.messages.create(
+            response = await self.client.messages.create(
                 model=model,
                 max_tokens=max_tokens,
                 temperature=temperature,
@@ -106,7 +110,7 @@ class GoogleProvider(LLMProvider):
                 max_output_tokens=3000,
             )
             
-            response = self.model.generate_content(
+            response = await self.model.generate_content_async(
                 prompt,
                 generation_config=generation_config
             )
@@ -118,17 +122,37 @@ class GoogleProvider(LLMProvider):
 
 class PerplexitySearch:
     """Cliente para búsqueda avanzada usando Perplexity API"""
+
+    # Tiempo de vida de los resultados cacheados; repetir el mismo tema
+    # dentro de esta ventana no vuelve a llamar a la API
+    CACHE_TTL_SEGUNDOS = 3600
     
     def __init__(self):
         self.api_key = settings.PERPLEXITY_API_KEY
         self.base_url = "https://api.perplexity.ai"
-    
+        # Cliente async compartido: reutiliza conexiones entre búsquedas
+        # en lugar de abrir una nueva por llamada
+        self._client: Optional[httpx.AsyncClient] = None
+        # Cache (topic, language) -> (timestamp, resultado)
+        self._cache: Dict[tuple, tuple] = {}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(base_url=self.base_url, timeout=30)
+        return self._client
+
+
     async def search_topic(self, topic: str, language: str = "es") -> str:
         """Buscar información actualizada sobre un tema"""
         if not self.api_key:
             logger.warning("PERPLEXITY_API_KEY no configurada, saltando búsqueda avanzada")
             return ""
-        
+
+        cache_key = (topic, language)
+        cached = self._cache.get(cache_key)
+        if cached is not None and time.monotonic() - cached[0] < self.CACHE_TTL_SEGUNDOS:
+            return cached[1]
+
         try:
             headers = {
                 "Authorization": f"Bearer {self.api_key}",
@@ -149,16 +173,17 @@ class PerplexitySearch:
                 ]
             }
             
-            response = requests.post(
-                f"{self.base_url}/chat/completions",
+            response = await self._get_client().post(
+                "/chat/completions",
                 headers=headers,
-                json=payload,
-                timeout=30
+                json=payload
             )
             
             if response.status_code == 200:
                 result = response.json()
-                return result['choices'][0]['message']['content']
+                content = result['choices'][0]['message']['content']
+                self._cache[cache_key] = (time.monotonic(), content)
+                return content
             else:
                 logger.warning(f"Error en búsqueda Perplexity: {response.status_code}")
                 return ""
@@ -169,69 +194,125 @@ class PerplexitySearch:
 
 class PromptQAGenerator:
     """Generador principal de Q&A basado en prompts"""
-    
+
+    # Máximo de preguntas pedidas en una sola llamada al LLM; por encima
+    # de este valor la calidad y el parseo se degradan, así que los lotes
+    # grandes se reparten en varias llamadas concurrentes
+    MAX_PREGUNTAS_POR_LLAMADA = 25
+
     def __init__(self):
         self.providers = {
             "openai": OpenAIProvider,
             "anthropic": AnthropicProvider,
             "google": GoogleProvider
         }
+        # Instancias creadas bajo demanda y reutilizadas: cada cliente de
+        # SDK mantiene su pool de conexiones, así que reinstanciarlo por
+        # llamada repetía el handshake TCP/TLS en cada batch
+        self._provider_instances: Dict[str, LLMProvider] = {}
         self.perplexity_search = PerplexitySearch()
-        
+
     def get_provider(self, provider_name: str) -> LLMProvider:
-        """Obtener instancia del proveedor especificado"""
+        """Obtener instancia del proveedor especificado (cacheada)"""
         if provider_name not in self.providers:
             raise ValueError(f"Proveedor no soportado: {provider_name}")
-        
-        try:
-            return self.providers[provider_name]()
-        except ValueError as e:
-            logger.error(f"Error configurando proveedor {provider_name}: {e}")
-            raise
+
+        provider = self._provider_instances.get(provider_name)
+        if provider is None:
+            try:
+                provider = self.providers[provider_name]()
+            except ValueError as e:
+                logger.error(f"Error configurando proveedor {provider_name}: {e}")
+                raise
+            self._provider_instances[provider_name] = provider
+
+        return provider
     
-    def create_prompt(self, request: GenerationRequest, additional_context: str = "") -> str:
-        """Crear prompt optimizado para generación de Q&A"""
-        
-        # Construir el prompt base
-        topic = request.tema or request.prompt
-        category = request.categoria or "general"
-        difficulty = request.nivel or "intermedio"
-        language = request.idioma or "es"
-        num_questions = request.num_preguntas or 10
-        
-        # Contexto adicional si hay búsqueda avanzada
-        context_section = ""
-        if additional_context:
-            context_section = f"\n\nContexto adicional actualizado:\n{additional_context}\n"
-        
-        prompt = settings.DEFAULT_QA_PROMPT_TEMPLATE.format(
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _format_base_prompt(topic: str, category: str, difficulty: str,
+                            language: str, num_questions: int) -> str:
+        """Formatear la plantilla base (memoizado por parámetros)"""
+        return settings.DEFAULT_QA_PROMPT_TEMPLATE.format(
             topic=topic,
             category=category,
             difficulty=difficulty,
             language=language,
             num_questions=num_questions
         )
-        
-        return prompt + context_section
+
+    def create_prompt(self, request: GenerationRequest, additional_context: str = "") -> str:
+        """Crear prompt optimizado para generación de Q&A"""
+
+        # La plantilla formateada se cachea: los sub-batches de un mismo
+        # request comparten todos los parámetros salvo el contexto
+        prompt = self._format_base_prompt(
+            request.tema or request.prompt,
+            request.categoria or "general",
+            request.nivel or "intermedio",
+            request.idioma or "es",
+            request.num_preguntas or 10
+        )
+
+        # Contexto adicional si hay búsqueda avanzada
+        if additional_context:
+            return prompt + f"\n\nContexto adicional actualizado:\n{additional_context}\n"
+        return prompt
     
+    # Patrones alternativos compilados una sola vez; el formato principal
+    # PREGUNTA:/RESPUESTA: se escanea con str.find (ver _scan_qa_markers)
+    QA_ALT_PATTERNS = [
+        re.compile(pattern, re.DOTALL | re.IGNORECASE)
+        for pattern in [
+            r'(?:Q|P):\s*(.+?)\s*(?:A|R):\s*(.+?)(?=(?:Q|P):|$)',
+            r'(\d+\.\s*.+?\?)\s*(.+?)(?=\d+\.|$)'
+        ]
+    ]
+
+    @staticmethod
+    def _scan_qa_markers(response: str) -> List[tuple]:
+        """Localizar pares PREGUNTA:/RESPUESTA: con str.find
+
+        str.find escanea a nivel C sin el motor de regex ni riesgo de
+        backtracking; una sola copia en mayúsculas da el match
+        insensible a mayúsculas.
+        """
+        upper = response.upper()
+        matches = []
+        i = 0
+        while True:
+            p = upper.find("PREGUNTA:", i)
+            if p < 0:
+                break
+            r = upper.find("RESPUESTA:", p)
+            if r < 0:
+                break
+
+            next_p = upper.find("PREGUNTA:", r + 10)
+            cat = upper.find("CATEGORIA:", r + 10)
+            limites = [pos for pos in (next_p, cat) if pos >= 0]
+            fin = min(limites) if limites else len(response)
+
+            question = response[p + 9:r]
+            answer = response[r + 10:fin]
+            matches.append((question, answer))
+
+            if next_p < 0:
+                break
+            i = next_p
+        return matches
+
     def parse_qa_response(self, response: str, request: GenerationRequest) -> List[QAItem]:
         """Parsear respuesta del LLM y convertir a QAItems"""
         qa_items = []
-        
-        # Patrón para extraer Q&A usando el formato esperado
-        pattern = r'PREGUNTA:\s*(.+?)\s*RESPUESTA:\s*(.+?)(?=PREGUNTA:|CATEGORIA:|$)'
-        matches = re.findall(pattern, response, re.DOTALL | re.IGNORECASE)
-        
+
+        # Extraer Q&A usando el formato esperado
+        matches = self._scan_qa_markers(response)
+
         # Si no funciona el patrón principal, intentar patrones alternativos
         if not matches:
-            # Patrón alternativo más flexible
-            alt_patterns = [
-                r'(?:Q|P):\s*(.+?)\s*(?:A|R):\s*(.+?)(?=(?:Q|P):|$)',
-                r'(\d+\.\s*.+?\?)\s*(.+?)(?=\d+\.|$)'
-            ]
-            
-            for pattern in alt_patterns:
-                matches = re.findall(pattern, response, re.DOTALL | re.IGNORECASE)
+            for pattern in self.QA_ALT_PATTERNS:
+                matches = pattern.findall(response)
                 if matches:
                     break
         
@@ -268,8 +349,16 @@ class PromptQAGenerator:
         
         return qa_items
     
-    async def generate_qa_batch(self, request: GenerationRequest) -> QABatch:
-        """Generar un lote completo de Q&A"""
+    async def generate_qa_batch(
+        self,
+        request: GenerationRequest,
+        progress_callback: Optional[callable] = None
+    ) -> QABatch:
+        """Generar un lote completo de Q&A
+
+        `progress_callback(completadas, total, items_generados)` se invoca
+        al terminar cada llamada al LLM cuando el lote se reparte en varias.
+        """
         logger.info(f"Generando Q&A batch: {request.dict()}")
         
         # Búsqueda avanzada si está habilitada
@@ -281,15 +370,37 @@ class PromptQAGenerator:
                 search_topic, request.idioma or "es"
             )
         
-        # Crear prompt
-        prompt = self.create_prompt(request, additional_context)
-        
-        # Obtener proveedor y generar
+        # Obtener proveedor y generar; los lotes grandes se reparten en
+        # varias llamadas concurrentes para amortizar las RTT
         provider = self.get_provider(request.modelo or "openai")
-        response = await provider.generate_qa(prompt)
-        
-        # Parsear respuesta
-        qa_items = self.parse_qa_response(response, request)
+        num_preguntas = request.num_preguntas or 10
+
+        if num_preguntas <= self.MAX_PREGUNTAS_POR_LLAMADA:
+            prompt = self.create_prompt(request, additional_context)
+            response = await provider.generate_qa(prompt)
+            qa_items = self.parse_qa_response(response, request)
+        else:
+            sub_requests = []
+            restantes = num_preguntas
+            while restantes > 0:
+                tamano = min(restantes, self.MAX_PREGUNTAS_POR_LLAMADA)
+                sub_requests.append(request.copy(update={"num_preguntas": tamano}))
+                restantes -= tamano
+
+            async def generar(sub: GenerationRequest):
+                response = await provider.generate_qa(self.create_prompt(sub, additional_context))
+                return sub, response
+
+            # as_completed permite reportar progreso a medida que cada
+            # llamada termina, en lugar de esperar a la más lenta
+            qa_items = []
+            completadas = 0
+            for futuro in asyncio.as_completed([generar(sub) for sub in sub_requests]):
+                sub, response = await futuro
+                qa_items.extend(self.parse_qa_response(response, sub))
+                completadas += 1
+                if progress_callback:
+                    progress_callback(completadas, len(sub_requests), len(qa_items))
         
         # Crear batch
         batch = QABatch(
@@ -4,11 +4,26 @@ Maneja múltiples fuentes, formatos y exportación
 """
 
 import csv
+import io
 import json
+import os
 import yaml
+from collections import Counter
+
+# Acelerador opcional: orjson serializa a nivel C y emite bytes directos;
+# si no está instalado se usa el json de la librería estándar
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# El dumper de libyaml serializa en C; si PyYAML se compiló sin él se usa
+# el SafeDumper puro-Python con la misma salida
+_YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
 from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Union
+import numpy as np
 import pandas as pd
 
 from config.settings import settings
@@ -17,66 +32,286 @@ from src.utils.data_models import QAItem, QABatch, ExportConfig
 
 logger = get_logger(__name__)
 
+# --- MinHash + LSH para deduplicación aproximada ---------------------------
+# Firmas MinHash sobre 3-gramas de palabras: dos items con alta similitud
+# Jaccard comparten con alta probabilidad algún bucket del índice LSH, así
+# que la fusión solo compara candidatos en lugar de todos los pares (O(n²))
+
+_NUM_PERM = 128
+# 32 bandas de 4 filas ≈ umbral de candidatura Jaccard ~0.4: deliberadamente
+# permisivo frente al umbral de fusión para no perder candidatos límite
+_LSH_BANDS = 32
+
+_rng = np.random.default_rng(0x5EED)
+_HASH_A = _rng.integers(1, np.iinfo(np.uint64).max, size=_NUM_PERM, dtype=np.uint64)
+_HASH_B = _rng.integers(0, np.iinfo(np.uint64).max, size=_NUM_PERM, dtype=np.uint64)
+
+def _minhash_signature(shingles: frozenset) -> np.ndarray:
+    """Firma MinHash de un conjunto de shingles (vectorizada con numpy)"""
+    if not shingles:
+        return np.zeros(_NUM_PERM, dtype=np.uint64)
+    base = np.fromiter(
+        (hash(s) & 0xFFFFFFFFFFFFFFFF for s in shingles),
+        dtype=np.uint64, count=len(shingles)
+    )
+    # Familia de permutaciones a_i*h + b_i con aritmética módulo 2^64
+    # (el overflow de uint64 hace de módulo)
+    return (_HASH_A[:, None] * base[None, :] + _HASH_B[:, None]).min(axis=1)
+
 class QADataUnifier:
     """Unificador de datos Q&A de múltiples fuentes"""
-    
+
+    # Sin __dict__ por instancia: los atributos son fijos y el acceso
+    # esquiva la sonda de diccionario
+    __slots__ = (
+        "batches", "unified_items", "_filter_cache", "_kw_index",
+        "_sigs", "_lsh_buckets", "_exact", "_df", "_pending_sigs",
+        "_cat_counter", "_nivel_counter", "_tema_counter",
+        "_idioma_counter", "_sum_confianza", "_sum_longitud_pregunta",
+        "_sum_longitud_respuesta", "_fecha_primera", "_fecha_ultima",
+    )
+
+    # Cantidad de items a partir de la cual compensa firmar en paralelo
+    # al agregar varios batches de una vez
+    MIN_ITEMS_FIRMA_PARALELA = 256
+
     def __init__(self):
         self.batches: List[QABatch] = []
         self.unified_items: List[QAItem] = []
-    
+        # Memoización de filtros: los mismos criterios sobre los mismos
+        # datos se resuelven sin re-escanear; se invalida al mutar
+        self._filter_cache: Dict[tuple, List[QAItem]] = {}
+        # Índice invertido palabra_clave -> ids de items, mantenido
+        # incrementalmente para resolver filtros de keywords sin escanear
+        self._kw_index: Dict[str, set] = {}
+        # Índice LSH: firma MinHash por id y buckets por banda de firma;
+        # la fusión consulta aquí los candidatos a duplicado
+        self._sigs: Dict[str, np.ndarray] = {}
+        self._lsh_buckets: Dict[tuple, set] = {}
+        # Tabla de duplicados exactos por texto normalizado: un item
+        # byte-idéntico se fusiona al ingresar con un lookup, sin pasar
+        # por firmas ni comparaciones difusas
+        self._exact: Dict[tuple, QAItem] = {}
+        # Vista columnar de los items para filtrado vectorizado; se
+        # reconstruye perezosamente tras cada mutación
+        self._df: Optional[pd.DataFrame] = None
+        # Firmas precomputadas en paralelo por add_batches, consumidas
+        # por _lsh_insert a medida que los items se insertan
+        self._pending_sigs: Dict[str, np.ndarray] = {}
+        self._reset_stats_accumulators()
+
+    def _reset_stats_accumulators(self):
+        """Reiniciar los acumuladores incrementales de estadísticas"""
+        self._cat_counter = Counter()
+        self._nivel_counter = Counter()
+        self._tema_counter = Counter()
+        self._idioma_counter = Counter()
+        self._sum_confianza = 0.0
+        self._sum_longitud_pregunta = 0
+        self._sum_longitud_respuesta = 0
+        self._fecha_primera: Optional[datetime] = None
+        self._fecha_ultima: Optional[datetime] = None
+
+    def _accumulate_stats(self, items: List[QAItem]):
+        """Actualizar los acumuladores con los items dados"""
+        for item in items:
+            self._cat_counter[item.categoria] += 1
+            self._nivel_counter[item.nivel] += 1
+            if item.tema:
+                self._tema_counter[item.tema] += 1
+            self._idioma_counter[item.idioma] += 1
+
+            self._sum_confianza += item.confianza
+            self._sum_longitud_pregunta += len(item.pregunta)
+            self._sum_longitud_respuesta += len(item.respuesta)
+
+            if self._fecha_primera is None or item.fecha_creacion < self._fecha_primera:
+                self._fecha_primera = item.fecha_creacion
+            if self._fecha_ultima is None or item.fecha_creacion > self._fecha_ultima:
+                self._fecha_ultima = item.fecha_creacion
+
+    def __len__(self) -> int:
+        """Cantidad de items unificados"""
+        return len(self.unified_items)
+
+    def clear(self):
+        """Vaciar el unificador: batches, items, índices y acumuladores
+
+        Resetear asignando listas vacías desde afuera dejaba vivos los
+        índices internos (_exact, LSH, keywords) y los acumuladores, y
+        un item re-agregado se fusionaba contra un objeto huérfano.
+        """
+        self.batches.clear()
+        self.unified_items.clear()
+        self._filter_cache.clear()
+        self._kw_index.clear()
+        self._sigs.clear()
+        self._lsh_buckets.clear()
+        self._exact.clear()
+        self._pending_sigs.clear()
+        self._df = None
+        self._reset_stats_accumulators()
+
+    def _index_keywords(self, items: List[QAItem]):
+        """Indexar las palabras clave de los items dados"""
+        for item in items:
+            for keyword in item.palabras_clave:
+                self._kw_index.setdefault(keyword.lower().strip(), set()).add(item.id)
+
+    def _lsh_insert(self, item: QAItem):
+        """Firmar el item e insertarlo en los buckets del índice LSH"""
+        sig = self._pending_sigs.pop(item.id, None)
+        if sig is None:
+            sig = _minhash_signature(item.shingles)
+        self._sigs[item.id] = sig
+        filas = _NUM_PERM // _LSH_BANDS
+        for banda in range(_LSH_BANDS):
+            key = (banda, sig[banda * filas:(banda + 1) * filas].tobytes())
+            self._lsh_buckets.setdefault(key, set()).add(item.id)
+
+    def _lsh_query(self, item_id: str) -> set:
+        """Ids candidatos a duplicado (comparten algún bucket con el item)"""
+        sig = self._sigs.get(item_id)
+        if sig is None:
+            return set()
+        filas = _NUM_PERM // _LSH_BANDS
+        candidatos = set()
+        for banda in range(_LSH_BANDS):
+            key = (banda, sig[banda * filas:(banda + 1) * filas].tobytes())
+            candidatos |= self._lsh_buckets.get(key, set())
+        candidatos.discard(item_id)
+        return candidatos
+
+    @staticmethod
+    def _merge_into(existing_item: QAItem, item: QAItem):
+        """Fusionar fuentes, palabras clave, respuesta y confianza"""
+        # Fusionar metadatos y fuentes; dict.fromkeys deduplica en una
+        # sola pasada preservando el orden de inserción (list(set(...))
+        # lo perdía y hacía la salida no determinista)
+        existing_item.fuentes = list(dict.fromkeys(existing_item.fuentes + item.fuentes))
+
+        # Fusionar palabras clave
+        existing_item.palabras_clave = list(
+            dict.fromkeys(existing_item.palabras_clave + item.palabras_clave)
+        )
+
+        # Usar la respuesta más larga si es significativamente diferente
+        if len(item.respuesta) > len(existing_item.respuesta) * 1.2:
+            existing_item.respuesta = item.respuesta
+            # Invalidar los derivados cacheados del item mutado
+            existing_item.__dict__.pop("_texto_busqueda", None)
+            existing_item.__dict__.pop("_shingles", None)
+
+        # Promediar confianza
+        existing_item.confianza = (existing_item.confianza + item.confianza) / 2
+
     def add_batch(self, batch: QABatch):
         """Agregar un batch al unificador"""
         self.batches.append(batch)
-        self.unified_items.extend(batch.items)
-        logger.info(f"Batch agregado: {len(batch.items)} items. Total: {len(self.unified_items)}")
+
+        # Atajo de duplicados exactos: el mismo texto normalizado se
+        # fusiona aquí mismo y no entra ni al índice LSH ni a la lista
+        nuevos: List[QAItem] = []
+        exactos = 0
+        for item in batch.items:
+            key = item.texto_busqueda
+            existing_item = self._exact.get(key)
+            if existing_item is not None:
+                confianza_antes = existing_item.confianza
+                respuesta_antes = len(existing_item.respuesta)
+                clave_antes = existing_item.texto_busqueda
+                self._merge_into(existing_item, item)
+                # Ajustar los acumuladores por la mutación del item
+                self._sum_confianza += existing_item.confianza - confianza_antes
+                if len(existing_item.respuesta) != respuesta_antes:
+                    # La respuesta fue reemplazada: corregir el acumulador
+                    # de longitudes y re-indexar el item bajo su nuevo
+                    # texto normalizado y su nueva firma
+                    self._sum_longitud_respuesta += (
+                        len(existing_item.respuesta) - respuesta_antes
+                    )
+                    del self._exact[clave_antes]
+                    self._exact[existing_item.texto_busqueda] = existing_item
+                    self._lsh_insert(existing_item)
+                self._index_keywords([existing_item])
+                exactos += 1
+                continue
+            self._exact[key] = item
+            self._lsh_insert(item)
+            nuevos.append(item)
+
+        self.unified_items.extend(nuevos)
+        self._index_keywords(nuevos)
+        self._accumulate_stats(nuevos)
+        self._filter_cache.clear()
+        self._df = None
+        if exactos:
+            logger.info(f"{exactos} duplicados exactos fusionados al agregar")
+        logger.info(f"Batch agregado: {len(nuevos)} items. Total: {len(self.unified_items)}")
     
     def add_batches(self, batches: List[QABatch]):
         """Agregar múltiples batches"""
-        for batch in batches:
-            self.add_batch(batch)
+        total = sum(len(batch.items) for batch in batches)
+        if total >= self.MIN_ITEMS_FIRMA_PARALELA:
+            # Precomputar las firmas MinHash en un pool de threads: el
+            # grueso del trabajo corre dentro de numpy, que libera el
+            # GIL, así que escala con los cores; la inserción en el
+            # índice LSH sigue siendo secuencial (no es thread-safe)
+            from concurrent.futures import ThreadPoolExecutor
+            from itertools import chain
+
+            all_items = list(chain.from_iterable(batch.items for batch in batches))
+            with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+                firmas = executor.map(
+                    lambda item: _minhash_signature(item.shingles), all_items
+                )
+                self._pending_sigs.update(
+                    (item.id, sig) for item, sig in zip(all_items, firmas)
+                )
+
+        try:
+            for batch in batches:
+                self.add_batch(batch)
+        finally:
+            # Las firmas de items fusionados como duplicados exactos no
+            # se consumen: descartarlas
+            self._pending_sigs.clear()
     
-    def merge_similar_items(self, similarity_threshold: float = 0.8) -> int:
-        """Fusionar elementos similares para eliminar duplicados"""
-        # Implementación básica basada en similitud de texto
-        from difflib import SequenceMatcher
-        
+    def merge_similar_items(self, similarity_threshold: float = 0.5) -> int:
+        """Fusionar elementos similares para eliminar duplicados
+
+        El umbral es similitud Jaccard sobre shingles de 3 palabras:
+        0.5 aquí equivale aproximadamente al antiguo 0.8 del ratio por
+        caracteres de SequenceMatcher para parafraseos cercanos.
+        """
+        # El índice LSH reduce la fusión de O(n²) comparaciones a una
+        # consulta de candidatos por item: solo se comparan pares que
+        # comparten algún bucket de firma MinHash
+        merged_by_id: Dict[str, QAItem] = {}
         merged_items = []
         merged_count = 0
-        
+
         for item in self.unified_items:
             is_duplicate = False
-            
-            # Comparar con items ya procesados
-            for existing_item in merged_items:
-                question_sim = SequenceMatcher(
-                    None, 
-                    item.pregunta.lower().strip(), 
-                    existing_item.pregunta.lower().strip()
-                ).ratio()
-                
-                answer_sim = SequenceMatcher(
-                    None, 
-                    item.respuesta.lower().strip(), 
-                    existing_item.respuesta.lower().strip()
-                ).ratio()
-                
+            item_shingles = item.shingles
+
+            # Comparar solo con candidatos ya conservados: la similitud
+            # residual es Jaccard sobre los shingles cacheados (una
+            # intersección/unión de sets por par, sin la recursión de
+            # SequenceMatcher)
+            for candidate_id in self._lsh_query(item.id):
+                existing_item = merged_by_id.get(candidate_id)
+                if existing_item is None:
+                    continue
+                existing_shingles = existing_item.shingles
+                union = len(item_shingles | existing_shingles)
+                similarity = (
+                    len(item_shingles & existing_shingles) / union if union else 0.0
+                )
+
                 # Si son muy similares, fusionar
-                if question_sim > similarity_threshold or answer_sim > similarity_threshold:
-                    # Fusionar metadatos y fuentes
-                    existing_item.fuentes.extend(item.fuentes)
-                    existing_item.fuentes = list(set(existing_item.fuentes))  # Eliminar duplicados
-                    
-                    # Fusionar palabras clave
-                    existing_item.palabras_clave.extend(item.palabras_clave)
-                    existing_item.palabras_clave = list(set(existing_item.palabras_clave))
-                    
-                    # Usar la respuesta más larga si es significativamente diferente
-                    if len(item.respuesta) > len(existing_item.respuesta) * 1.2:
-                        existing_item.respuesta = item.respuesta
-                    
-                    # Promediar confianza
-                    existing_item.confianza = (existing_item.confianza + item.confianza) / 2
-                    
+                if similarity > similarity_threshold:
+                    self._merge_into(existing_item, item)
                     merged_count += 1
                     is_duplicate = True
                     break
@@ -84,115 +319,165 @@ class QADataUnifier:
             # Si no es duplicado, agregar como nuevo
             if not is_duplicate:
                 merged_items.append(item)
-        
+                merged_by_id[item.id] = item
+
         self.unified_items = merged_items
+        self._filter_cache.clear()
+        self._df = None
+        # La fusión puede combinar palabras clave, mutar items y eliminar
+        # otros: reconstruir índices y acumuladores desde el resultado
+        self._kw_index.clear()
+        self._index_keywords(self.unified_items)
+        self._sigs.clear()
+        self._lsh_buckets.clear()
+        self._exact.clear()
+        for item in self.unified_items:
+            self._exact[item.texto_busqueda] = item
+            self._lsh_insert(item)
+        self._reset_stats_accumulators()
+        self._accumulate_stats(self.unified_items)
         logger.info(f"Fusionados {merged_count} elementos duplicados. Quedan: {len(self.unified_items)}")
-        
+
         return merged_count
-    
+
+    @staticmethod
+    def _filter_cache_key(filters: Dict[str, Any]) -> Optional[tuple]:
+        """Clave hasheable para memoizar un conjunto de filtros
+
+        Retorna None si algún valor no es hasheable (no se cachea).
+        """
+        try:
+            return tuple(sorted(
+                (key, tuple(value) if isinstance(value, list) else value)
+                for key, value in filters.items()
+            ))
+        except TypeError:
+            return None
+
+    def _get_filter_df(self) -> pd.DataFrame:
+        """Vista columnar de los items para filtrado vectorizado
+
+        Los validadores ya normalizan categoria/tema a minúsculas y los
+        niveles son literales en minúsculas, así que las columnas se
+        usan directamente sin re-normalizar por llamada.
+        """
+        if self._df is None:
+            items = self.unified_items
+            self._df = pd.DataFrame({
+                "categoria": [item.categoria for item in items],
+                "nivel": [item.nivel for item in items],
+                "tema": [item.tema for item in items],
+                "confianza": [item.confianza for item in items],
+                "fecha_creacion": [item.fecha_creacion for item in items],
+            })
+        return self._df
+
     def filter_items(self, filters: Dict[str, Any]) -> List[QAItem]:
         """Filtrar elementos según criterios"""
-        filtered_items = self.unified_items.copy()
-        
-        # Filtrar por categoría
+        cache_key = self._filter_cache_key(filters)
+        if cache_key is not None and cache_key in self._filter_cache:
+            return list(self._filter_cache[cache_key])
+
+        # Máscara booleana vectorizada sobre la vista columnar: una
+        # comparación en C por criterio en lugar de una list comprehension
+        # con .lower() por item y por filtro
+        df = self._get_filter_df()
+        mask = np.ones(len(df), dtype=bool)
+
         if 'categoria' in filters and filters['categoria']:
-            categoria = filters['categoria'].lower()
-            filtered_items = [item for item in filtered_items if item.categoria.lower() == categoria]
-        
-        # Filtrar por nivel
+            mask &= (df["categoria"].values == filters['categoria'].lower())
+
         if 'nivel' in filters and filters['nivel']:
-            nivel = filters['nivel'].lower()
-            filtered_items = [item for item in filtered_items if item.nivel.lower() == nivel]
-        
-        # Filtrar por tema
+            mask &= (df["nivel"].values == filters['nivel'].lower())
+
         if 'tema' in filters and filters['tema']:
-            tema = filters['tema'].lower()
-            filtered_items = [item for item in filtered_items if tema in item.tema.lower()]
-        
-        # Filtrar por confianza mínima
+            mask &= df["tema"].str.contains(filters['tema'].lower(), regex=False).values
+
         if 'confianza_minima' in filters and filters['confianza_minima']:
-            min_conf = float(filters['confianza_minima'])
-            filtered_items = [item for item in filtered_items if item.confianza >= min_conf]
-        
-        # Filtrar por fecha
+            mask &= (df["confianza"].values >= float(filters['confianza_minima']))
+
         if 'fecha_desde' in filters and filters['fecha_desde']:
             fecha_desde = filters['fecha_desde']
             if isinstance(fecha_desde, str):
                 fecha_desde = datetime.fromisoformat(fecha_desde)
-            filtered_items = [item for item in filtered_items if item.fecha_creacion >= fecha_desde]
-        
-        # Filtrar por palabras clave
+            mask &= (df["fecha_creacion"] >= fecha_desde).values
+
+        filtered_items = [self.unified_items[i] for i in np.flatnonzero(mask)]
+
+        # Filtrar por palabras clave: el índice invertido resuelve las
+        # coincidencias exactas con una unión de sets; el texto se revisa
+        # con la versión en minúsculas ya cacheada en el item
         if 'palabras_clave' in filters and filters['palabras_clave']:
             keywords = [kw.lower().strip() for kw in filters['palabras_clave']]
+            indexed_ids = set().union(
+                *(self._kw_index.get(kw, set()) for kw in keywords)
+            )
             filtered_items = [
-                item for item in filtered_items 
-                if any(kw in item.pregunta.lower() or kw in item.respuesta.lower() for kw in keywords)
+                item for item in filtered_items
+                if item.id in indexed_ids
+                or any(
+                    kw in item.texto_busqueda[0] or kw in item.texto_busqueda[1]
+                    for kw in keywords
+                )
             ]
         
+        if cache_key is not None:
+            self._filter_cache[cache_key] = list(filtered_items)
+
         logger.info(f"Filtrado aplicado: {len(filtered_items)}/{len(self.unified_items)} elementos")
         return filtered_items
     
     def get_statistics(self) -> Dict[str, Any]:
-        """Obtener estadísticas del conjunto unificado"""
+        """Obtener estadísticas del conjunto unificado
+
+        Los acumuladores se mantienen incrementalmente en add_batch, así
+        que aquí solo se arma el dict: O(1) respecto al número de items.
+        """
         if not self.unified_items:
             return {"total": 0}
-        
-        # Estadísticas básicas
-        stats = {
-            "total_items": len(self.unified_items),
-            "total_batches": len(self.batches),
-            "fecha_primera_creacion": min(item.fecha_creacion for item in self.unified_items),
-            "fecha_ultima_creacion": max(item.fecha_creacion for item in self.unified_items)
-        }
-        
-        # Distribución por categoría
-        categorias = {}
-        niveles = {}
-        temas = {}
-        idiomas = {}
-        origenes = {}
-        
-        for item in self.unified_items:
-            # Categorías
-            categorias[item.categoria] = categorias.get(item.categoria, 0) + 1
-            
-            # Niveles
-            niveles[item.nivel] = niveles.get(item.nivel, 0) + 1
-            
-            # Temas
-            if item.tema:
-                temas[item.tema] = temas.get(item.tema, 0) + 1
-            
-            # Idiomas
-            idiomas[item.idioma] = idiomas.get(item.idioma, 0) + 1
-        
+
         # Orígenes de los batches
+        origenes = Counter()
         for batch in self.batches:
-            origenes[batch.origen] = origenes.get(batch.origen, 0) + len(batch.items)
-        
-        stats.update({
-            "distribucion_categorias": categorias,
-            "distribucion_niveles": niveles,
-            "distribucion_temas": dict(sorted(temas.items(), key=lambda x: x[1], reverse=True)[:10]),  # Top 10
-            "distribucion_idiomas": idiomas,
-            "distribucion_origenes": origenes,
-            "confianza_promedio": sum(item.confianza for item in self.unified_items) / len(self.unified_items),
-            "longitud_pregunta_promedio": sum(len(item.pregunta) for item in self.unified_items) / len(self.unified_items),
-            "longitud_respuesta_promedio": sum(len(item.respuesta) for item in self.unified_items) / len(self.unified_items)
-        })
-        
-        return stats
+            origenes[batch.origen] += len(batch.items)
+
+        total = len(self.unified_items)
+
+        return {
+            "total_items": total,
+            "total_batches": len(self.batches),
+            "fecha_primera_creacion": self._fecha_primera,
+            "fecha_ultima_creacion": self._fecha_ultima,
+            "distribucion_categorias": dict(self._cat_counter),
+            "distribucion_niveles": dict(self._nivel_counter),
+            "distribucion_temas": dict(self._tema_counter.most_common(10)),  # Top 10
+            "distribucion_idiomas": dict(self._idioma_counter),
+            "distribucion_origenes": dict(origenes),
+            "confianza_promedio": self._sum_confianza / total,
+            "longitud_pregunta_promedio": self._sum_longitud_pregunta / total,
+            "longitud_respuesta_promedio": self._sum_longitud_respuesta / total
+        }
 
 class QAExporter:
     """Exportador de datos Q&A a diferentes formatos"""
-    
+
+    __slots__ = ("supported_formats",)
+
+    # Columnas fijas de toda fila exportada; las meta_* se descubren por item
+    BASE_COLUMNS = (
+        "id", "pregunta", "respuesta", "categoria", "nivel", "tema",
+        "idioma", "confianza", "fecha_creacion", "fuentes", "palabras_clave"
+    )
+
     def __init__(self):
         self.supported_formats = ['csv', 'json', 'xlsx', 'yaml']
-    
-    def prepare_export_data(self, items: List[QAItem], include_metadata: bool = True) -> List[Dict[str, Any]]:
-        """Preparar datos para exportación"""
-        export_data = []
-        
+
+    def iter_export_rows(self, items: List[QAItem], include_metadata: bool = True):
+        """Generar filas de exportación una a una
+
+        Los exportadores en streaming consumen este generador para no
+        materializar todas las filas en memoria a la vez.
+        """
         for item in items:
             row = {
                 "id": item.id,
@@ -207,83 +492,123 @@ class QAExporter:
                 "fuentes": "|".join(item.fuentes) if item.fuentes else "",
                 "palabras_clave": "|".join(item.palabras_clave) if item.palabras_clave else ""
             }
-            
+
             if include_metadata and item.metadatos:
                 # Agregar metadatos como columnas adicionales
                 for key, value in item.metadatos.items():
                     row[f"meta_{key}"] = str(value)
-            
-            export_data.append(row)
-        
-        return export_data
-    
+
+            yield row
+
+    def prepare_export_data(self, items: List[QAItem], include_metadata: bool = True) -> List[Dict[str, Any]]:
+        """Preparar datos para exportación"""
+        return list(self.iter_export_rows(items, include_metadata))
+
+    def _collect_columns(self, items: List[QAItem], include_metadata: bool = True) -> List[str]:
+        """Obtener todas las columnas posibles sin materializar las filas"""
+        all_columns = set(self.BASE_COLUMNS)
+        if include_metadata:
+            for item in items:
+                all_columns.update(f"meta_{key}" for key in item.metadatos)
+        return sorted(all_columns)
+
     def export_to_csv(self, items: List[QAItem], file_path: str, include_metadata: bool = True):
-        """Exportar a formato CSV"""
-        data = self.prepare_export_data(items, include_metadata)
-        
-        if not data:
+        """Exportar a formato CSV (streaming, fila a fila)"""
+        if not items:
             logger.warning("No hay datos para exportar")
             return
-        
-        # Obtener todas las columnas posibles
-        all_columns = set()
-        for row in data:
-            all_columns.update(row.keys())
-        
-        columns = sorted(all_columns)
-        
+
+        columns = self._collect_columns(items, include_metadata)
+
         with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
             writer = csv.DictWriter(csvfile, fieldnames=columns)
             writer.writeheader()
-            writer.writerows(data)
-        
-        logger.info(f"Exportado a CSV: {file_path} ({len(data)} elementos)")
-    
+            writer.writerows(self.iter_export_rows(items, include_metadata))
+
+        logger.info(f"Exportado a CSV: {file_path} ({len(items)} elementos)")
+
     def export_to_json(self, items: List[QAItem], file_path: str, include_metadata: bool = True):
-        """Exportar a formato JSON"""
-        data = self.prepare_export_data(items, include_metadata)
-        
-        export_structure = {
-            "metadata": {
-                "total_items": len(data),
-                "export_date": datetime.now().isoformat(),
-                "format_version": "1.0"
-            },
-            "qa_items": data
+        """Exportar a formato JSON (streaming, item a item)"""
+        metadata = {
+            "total_items": len(items),
+            "export_date": datetime.now().isoformat(),
+            "format_version": "1.0"
         }
-        
-        with open(file_path, 'w', encoding='utf-8') as jsonfile:
-            json.dump(export_structure, jsonfile, ensure_ascii=False, indent=2)
-        
-        logger.info(f"Exportado a JSON: {file_path} ({len(data)} elementos)")
+
+        # Escribir el envoltorio a mano y volcar cada item por separado:
+        # la memoria queda plana en lugar de crecer con el conjunto.
+        # Con orjson disponible se serializa a bytes directamente (sin
+        # pasar por la capa de texto); si no, json estándar
+        if orjson is not None:
+            with open(file_path, 'wb') as jsonfile:
+                jsonfile.write(b'{"metadata": ')
+                jsonfile.write(orjson.dumps(metadata))
+                jsonfile.write(b', "qa_items": [')
+                for i, row in enumerate(self.iter_export_rows(items, include_metadata)):
+                    if i:
+                        jsonfile.write(b', ')
+                    jsonfile.write(orjson.dumps(row))
+                jsonfile.write(b']}')
+        else:
+            with open(file_path, 'w', encoding='utf-8') as jsonfile:
+                jsonfile.write('{"metadata": ')
+                json.dump(metadata, jsonfile, ensure_ascii=False)
+                jsonfile.write(', "qa_items": [')
+                for i, row in enumerate(self.iter_export_rows(items, include_metadata)):
+                    if i:
+                        jsonfile.write(', ')
+                    json.dump(row, jsonfile, ensure_ascii=False)
+                jsonfile.write(']}')
+
+        logger.info(f"Exportado a JSON: {file_path} ({len(items)} elementos)")
     
+    def _build_xlsx_workbook(self, items: List[QAItem], include_metadata: bool = True):
+        """Armar el workbook de exportación (datos + hoja Resumen)
+
+        Lo comparten la exportación a disco y la serialización en
+        memoria, para que el archivo descargado y el escrito tengan el
+        mismo formato de dos hojas.
+        """
+        from openpyxl import Workbook
+
+        columns = self._collect_columns(items, include_metadata)
+
+        # write_only serializa cada fila al vuelo en lugar de mantener
+        # todas las celdas en memoria; los valores categóricos repetidos
+        # se comparten vía la tabla de shared strings del formato
+        workbook = Workbook(write_only=True)
+        data_sheet = workbook.create_sheet('QA_Data')
+        data_sheet.append(columns)
+
+        categorias = set()
+        niveles = set()
+        idiomas = set()
+
+        for row in self.iter_export_rows(items, include_metadata):
+            categorias.add(row["categoria"])
+            niveles.add(row["nivel"])
+            idiomas.add(row["idioma"])
+            data_sheet.append([row.get(column, "") for column in columns])
+
+        # Hoja de resumen
+        summary_sheet = workbook.create_sheet('Resumen')
+        summary_sheet.append(["Estadística", "Valor"])
+        summary_sheet.append(["Total elementos", len(items)])
+        summary_sheet.append(["Categorías únicas", len(categorias)])
+        summary_sheet.append(["Niveles únicos", len(niveles)])
+        summary_sheet.append(["Idiomas únicos", len(idiomas)])
+
+        return workbook
+
     def export_to_xlsx(self, items: List[QAItem], file_path: str, include_metadata: bool = True):
-        """Exportar a formato Excel"""
-        data = self.prepare_export_data(items, include_metadata)
-        
-        if not data:
+        """Exportar a formato Excel (workbook write-only, fila a fila)"""
+        if not items:
             logger.warning("No hay datos para exportar")
             return
-        
-        df = pd.DataFrame(data)
-        
-        with pd.ExcelWriter(file_path, engine='openpyxl') as writer:
-            # Hoja principal con datos
-            df.to_excel(writer, sheet_name='QA_Data', index=False)
-            
-            # Hoja de resumen
-            summary_data = {
-                "Estadística": ["Total elementos", "Categorías únicas", "Niveles únicos", "Idiomas únicos"],
-                "Valor": [
-                    len(data),
-                    len(set(item.get('categoria', '') for item in data)),
-                    len(set(item.get('nivel', '') for item in data)),
-                    len(set(item.get('idioma', '') for item in data))
-                ]
-            }
-            pd.DataFrame(summary_data).to_excel(writer, sheet_name='Resumen', index=False)
-        
-        logger.info(f"Exportado a Excel: {file_path} ({len(data)} elementos)")
+
+        self._build_xlsx_workbook(items, include_metadata).save(file_path)
+
+        logger.info(f"Exportado a Excel: {file_path} ({len(items)} elementos)")
     
     def export_to_yaml(self, items: List[QAItem], file_path: str, include_metadata: bool = True):
         """Exportar a formato YAML"""
@@ -299,37 +624,96 @@ class QAExporter:
         }
         
         with open(file_path, 'w', encoding='utf-8') as yamlfile:
-            yaml.dump(export_structure, yamlfile, default_flow_style=False, allow_unicode=True)
+            yaml.dump(
+                export_structure, yamlfile, Dumper=_YAML_DUMPER,
+                default_flow_style=False, allow_unicode=True
+            )
         
         logger.info(f"Exportado a YAML: {file_path} ({len(data)} elementos)")
     
-    def export(self, items: List[QAItem], config: ExportConfig):
-        """Exportar usando configuración específica"""
-        # Aplicar filtros si existen
-        if config.filtros:
-            # Aquí se aplicarían los filtros, por simplicidad asumimos que ya están aplicados
-            pass
-        
-        # Determinar ruta de archivo
+    def render_bytes(self, items: List[QAItem], config: ExportConfig) -> bytes:
+        """Serializar los items al formato configurado, en memoria"""
+        data = self.prepare_export_data(items, config.incluir_metadatos)
+
+        if config.formato == "csv":
+            buffer = io.StringIO(newline='')
+            all_columns = set()
+            for row in data:
+                all_columns.update(row.keys())
+            writer = csv.DictWriter(buffer, fieldnames=sorted(all_columns))
+            writer.writeheader()
+            writer.writerows(data)
+            return buffer.getvalue().encode('utf-8')
+
+        export_structure = {
+            "metadata": {
+                "total_items": len(data),
+                "export_date": datetime.now().isoformat(),
+                "format_version": "1.0"
+            },
+            "qa_items": data
+        }
+
+        if config.formato == "json":
+            if orjson is not None:
+                return orjson.dumps(export_structure, option=orjson.OPT_INDENT_2)
+            return json.dumps(export_structure, ensure_ascii=False, indent=2).encode('utf-8')
+        elif config.formato == "yaml":
+            return yaml.dump(
+                export_structure, Dumper=_YAML_DUMPER,
+                default_flow_style=False, allow_unicode=True
+            ).encode('utf-8')
+        elif config.formato == "xlsx":
+            buffer = io.BytesIO()
+            self._build_xlsx_workbook(items, config.incluir_metadatos).save(buffer)
+            return buffer.getvalue()
+        else:
+            raise ValueError(f"Formato no soportado: {config.formato}")
+
+    def _resolve_output_path(self, config: ExportConfig) -> Path:
+        """Determinar la ruta completa de salida según la configuración"""
         if config.ruta_salida:
             output_path = Path(config.ruta_salida)
         else:
             output_path = settings.OUTPUT_DIR
-        
+
         # Crear nombre de archivo si no se especifica
         if config.nombre_archivo:
             filename = config.nombre_archivo
         else:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"qa_export_{timestamp}.{config.formato}"
-        
+
         # Asegurar que la ruta tenga la extensión correcta
         if not filename.endswith(f".{config.formato}"):
             filename += f".{config.formato}"
-        
+
         full_path = output_path / filename
         full_path.parent.mkdir(parents=True, exist_ok=True)
-        
+        return full_path
+
+    def export_with_bytes(self, items: List[QAItem], config: ExportConfig) -> tuple:
+        """Exportar a disco y retornar también el contenido serializado
+
+        Serializa una sola vez en memoria y escribe esos mismos bytes,
+        evitando la relectura del archivo (p.ej. para botones de descarga).
+        """
+        full_path = self._resolve_output_path(config)
+        content = self.render_bytes(items, config)
+        full_path.write_bytes(content)
+
+        logger.info(f"Exportado a {config.formato.upper()}: {full_path} ({len(items)} elementos)")
+        return str(full_path), content
+
+    def export(self, items: List[QAItem], config: ExportConfig):
+        """Exportar usando configuración específica"""
+        # Aplicar filtros si existen
+        if config.filtros:
+            # Aquí se aplicarían los filtros, por simplicidad asumimos que ya están aplicados
+            pass
+
+        full_path = self._resolve_output_path(config)
+
         # Exportar según formato
         if config.formato == "csv":
             self.export_to_csv(items, str(full_path), config.incluir_metadatos)
@@ -346,7 +730,9 @@ class QAExporter:
 
 class QADataManager:
     """Manager principal para unificación y exportación de datos Q&A"""
-    
+
+    __slots__ = ("unifier", "exporter")
+
     def __init__(self):
         self.unifier = QADataUnifier()
         self.exporter = QAExporter()
@@ -373,23 +759,56 @@ class QADataManager:
         self,
         export_config: ExportConfig,
         remove_duplicates: bool = True,
-        similarity_threshold: float = 0.8
-    ) -> str:
-        """Procesar datos y exportar"""
-        
+        similarity_threshold: float = 0.5,
+        return_bytes: bool = False
+    ) -> Union[str, tuple]:
+        """Procesar datos y exportar
+
+        Con `return_bytes=True` retorna `(ruta, contenido)` para que el
+        llamador pueda ofrecer el archivo sin releerlo de disco.
+        """
+
         # Eliminar duplicados si se solicita
         if remove_duplicates:
             self.unifier.merge_similar_items(similarity_threshold)
-        
+
         # Aplicar filtros
         items_to_export = self.unifier.filter_items(export_config.filtros)
-        
+
         # Exportar
+        if return_bytes:
+            output_path, content = self.exporter.export_with_bytes(items_to_export, export_config)
+            logger.info(f"Procesamiento y exportación completados: {output_path}")
+            return output_path, content
+
         output_path = self.exporter.export(items_to_export, export_config)
-        
+
         logger.info(f"Procesamiento y exportación completados: {output_path}")
         return output_path
     
+    def process_and_export_many(
+        self,
+        export_configs: List[ExportConfig],
+        remove_duplicates: bool = True,
+        similarity_threshold: float = 0.5
+    ) -> List[str]:
+        """Exportar varias configuraciones en una sola pasada de proceso
+
+        La deduplicación (la parte cara, O(N²)) se ejecuta una única vez
+        para todo el grupo; cada configuración aplica después sus filtros
+        (memoizados en el unificador) y escribe su formato.
+        """
+        if remove_duplicates:
+            self.unifier.merge_similar_items(similarity_threshold)
+
+        output_paths = []
+        for config in export_configs:
+            items_to_export = self.unifier.filter_items(config.filtros)
+            output_paths.append(self.exporter.export(items_to_export, config))
+
+        logger.info(f"Exportación múltiple completada: {len(output_paths)} archivos")
+        return output_paths
+
     def get_summary(self) -> Dict[str, Any]:
         """Obtener resumen de los datos"""
         return self.unifier.get_statistics()
@@ -3,77 +3,124 @@ Sistema unificador y exportador de datos Q&A - Versión Simple
 Maneja múltiples fuentes, formatos y exportación sin dependencias complejas
 """
 
-import csv
+import io
 import json
+import logging
 import yaml
+from collections import Counter
+from functools import lru_cache
+from statistics import fmean
 from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Union
-import pandas as pd
 
 from config.settings import settings
-from src.utils.simple_logger import get_logger
 from src.utils.data_models import QAItem, QABatch, ExportConfig
 
-logger = get_logger(__name__)
+logger = logging.getLogger(__name__)
+
+# El dumper de libyaml serializa en C; si PyYAML se compiló sin él se usa
+# el SafeDumper puro-Python con la misma salida
+_YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+@lru_cache(maxsize=64)
+def _compile_filter(categoria: Optional[str], nivel: Optional[str],
+                    tema: Optional[str], confianza_minima: Optional[float]):
+    """Compilar un predicado especializado para una combinación de filtros
+
+    Los filtros cambian poco entre llamadas: en lugar de re-interpretar
+    el dict de filtros por cada item, se genera una función recta con
+    solo las cláusulas activas (las inactivas se omiten del cuerpo) y
+    se cachea por combinación de valores.
+    """
+    clausulas = []
+    if categoria is not None:
+        clausulas.append(f"item.categoria == {categoria!r}")
+    if nivel is not None:
+        clausulas.append(f"item.nivel == {nivel!r}")
+    if tema is not None:
+        clausulas.append(f"{tema!r} in item.tema")
+    if confianza_minima is not None:
+        clausulas.append(f"item.confianza >= {confianza_minima!r}")
+
+    cuerpo = " and ".join(clausulas) or "True"
+    namespace: Dict[str, Any] = {}
+    exec(f"def _pred(item):\n    return {cuerpo}\n", namespace)
+    return namespace["_pred"]
 
 class QADataUnifier:
     """Unificador de datos Q&A de múltiples fuentes"""
-    
+
+    # Atributos fijos: sin __dict__ por instancia
+    __slots__ = ("batches", "unified_items")
+
     def __init__(self):
         self.batches: List[QABatch] = []
         self.unified_items: List[QAItem] = []
     
+    def clear(self):
+        """Vaciar el unificador (batches e items)"""
+        self.batches.clear()
+        self.unified_items.clear()
+
     def add_batch(self, batch: QABatch):
         """Agregar un batch al unificador"""
         self.batches.append(batch)
         self.unified_items.extend(batch.items)
-        logger.info(f"Batch agregado: {len(batch.items)} items. Total: {len(self.unified_items)}")
+        # Evitar formatear el f-string cuando INFO está deshabilitado
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(f"Batch agregado: {len(batch.items)} items. Total: {len(self.unified_items)}")
     
     def add_batches(self, batches: List[QABatch]):
         """Agregar múltiples batches"""
         for batch in batches:
             self.add_batch(batch)
     
-    def merge_similar_items(self, similarity_threshold: float = 0.8) -> int:
-        """Fusionar elementos similares para eliminar duplicados"""
-        # Implementación básica basada en similitud de texto
-        from difflib import SequenceMatcher
-        
+    def merge_similar_items(self, similarity_threshold: float = 0.5) -> int:
+        """Fusionar elementos similares para eliminar duplicados
+
+        El umbral es similitud Jaccard sobre shingles de 3 palabras:
+        0.5 aquí equivale aproximadamente al antiguo 0.8 del ratio por
+        caracteres de SequenceMatcher para parafraseos cercanos.
+        """
+        # Similitud Jaccard sobre los shingles cacheados del item: una
+        # intersección/unión de sets por par en lugar de la recursión de
+        # SequenceMatcher
         merged_items = []
         merged_count = 0
-        
+
         for item in self.unified_items:
             is_duplicate = False
-            
+            item_shingles = item.shingles
+
             # Comparar con items ya procesados
             for existing_item in merged_items:
-                question_sim = SequenceMatcher(
-                    None, 
-                    item.pregunta.lower().strip(), 
-                    existing_item.pregunta.lower().strip()
-                ).ratio()
-                
-                answer_sim = SequenceMatcher(
-                    None, 
-                    item.respuesta.lower().strip(), 
-                    existing_item.respuesta.lower().strip()
-                ).ratio()
-                
+                existing_shingles = existing_item.shingles
+                union = len(item_shingles | existing_shingles)
+                similarity = (
+                    len(item_shingles & existing_shingles) / union if union else 0.0
+                )
+
                 # Si son muy similares, fusionar
-                if question_sim > similarity_threshold or answer_sim > similarity_threshold:
-                    # Fusionar metadatos y fuentes
-                    existing_item.fuentes.extend(item.fuentes)
-                    existing_item.fuentes = list(set(existing_item.fuentes))  # Eliminar duplicados
-                    
+                if similarity > similarity_threshold:
+                    # Fusionar metadatos y fuentes; dict.fromkeys deduplica
+                    # en una pasada preservando el orden de inserción
+                    existing_item.fuentes = list(
+                        dict.fromkeys(existing_item.fuentes + item.fuentes)
+                    )
+
                     # Fusionar palabras clave
-                    existing_item.palabras_clave.extend(item.palabras_clave)
-                    existing_item.palabras_clave = list(set(existing_item.palabras_clave))
+                    existing_item.palabras_clave = list(
+                        dict.fromkeys(existing_item.palabras_clave + item.palabras_clave)
+                    )
                     
                     # Usar la respuesta más larga si es significativamente diferente
                     if len(item.respuesta) > len(existing_item.respuesta) * 1.2:
                         existing_item.respuesta = item.respuesta
-                    
+                        # Invalidar los derivados cacheados del item mutado
+                        existing_item.__dict__.pop("_texto_busqueda", None)
+                        existing_item.__dict__.pop("_shingles", None)
+
                     # Promediar confianza
                     existing_item.confianza = (existing_item.confianza + item.confianza) / 2
                     
@@ -92,28 +139,20 @@ class QADataUnifier:
     
     def filter_items(self, filters: Dict[str, Any]) -> List[QAItem]:
         """Filtrar elementos según criterios"""
-        filtered_items = self.unified_items.copy()
-        
-        # Filtrar por categoría
-        if 'categoria' in filters and filters['categoria']:
-            categoria = filters['categoria'].lower()
-            filtered_items = [item for item in filtered_items if item.categoria.lower() == categoria]
-        
-        # Filtrar por nivel
-        if 'nivel' in filters and filters['nivel']:
-            nivel = filters['nivel'].lower()
-            filtered_items = [item for item in filtered_items if item.nivel.lower() == nivel]
-        
-        # Filtrar por tema
-        if 'tema' in filters and filters['tema']:
-            tema = filters['tema'].lower()
-            filtered_items = [item for item in filtered_items if tema in item.tema.lower()]
-        
-        # Filtrar por confianza mínima
-        if 'confianza_minima' in filters and filters['confianza_minima']:
-            min_conf = float(filters['confianza_minima'])
-            filtered_items = [item for item in filtered_items if item.confianza >= min_conf]
-        
+        # El validador de QAItem ya normaliza categoria/tema a minúsculas
+        # y nivel es un Literal en minúsculas: solo se normaliza el lado
+        # del filtro, sin .lower() por item
+        categoria = filters['categoria'].lower() if filters.get('categoria') else None
+        nivel = filters['nivel'].lower() if filters.get('nivel') else None
+        tema = filters['tema'].lower() if filters.get('tema') else None
+        confianza_minima = (
+            float(filters['confianza_minima']) if filters.get('confianza_minima') else None
+        )
+
+        # Una sola pasada con el predicado compilado para esta combinación
+        pred = _compile_filter(categoria, nivel, tema, confianza_minima)
+        filtered_items = [item for item in self.unified_items if pred(item)]
+
         logger.info(f"Filtrado aplicado: {len(filtered_items)}/{len(self.unified_items)} elementos")
         return filtered_items
     
@@ -128,102 +167,131 @@ class QADataUnifier:
             "total_batches": len(self.batches),
         }
         
-        # Distribución por categoría
-        categorias = {}
-        niveles = {}
-        temas = {}
-        idiomas = {}
-        origenes = {}
-        
-        for item in self.unified_items:
-            # Categorías
-            categorias[item.categoria] = categorias.get(item.categoria, 0) + 1
-            
-            # Niveles
-            niveles[item.nivel] = niveles.get(item.nivel, 0) + 1
-            
-            # Temas
-            if item.tema:
-                temas[item.tema] = temas.get(item.tema, 0) + 1
-            
-            # Idiomas
-            idiomas[item.idioma] = idiomas.get(item.idioma, 0) + 1
-        
+        # Distribuciones con Counter: el conteo corre en C en lugar de
+        # un dict.get + asignación por item en bytecode
+        items = self.unified_items
+        categorias = Counter(item.categoria for item in items)
+        niveles = Counter(item.nivel for item in items)
+        temas = Counter(item.tema for item in items if item.tema)
+        idiomas = Counter(item.idioma for item in items)
+
         # Orígenes de los batches
+        origenes = Counter()
         for batch in self.batches:
-            origenes[batch.origen] = origenes.get(batch.origen, 0) + len(batch.items)
-        
+            origenes[batch.origen] += len(batch.items)
+
         stats.update({
-            "distribucion_categorias": categorias,
-            "distribucion_niveles": niveles,
-            "distribucion_temas": dict(sorted(temas.items(), key=lambda x: x[1], reverse=True)[:10]),
-            "distribucion_idiomas": idiomas,
-            "distribucion_origenes": origenes,
-            "confianza_promedio": sum(item.confianza for item in self.unified_items) / len(self.unified_items),
+            "distribucion_categorias": dict(categorias),
+            "distribucion_niveles": dict(niveles),
+            "distribucion_temas": dict(temas.most_common(10)),
+            "distribucion_idiomas": dict(idiomas),
+            "distribucion_origenes": dict(origenes),
+            "confianza_promedio": fmean(item.confianza for item in items),
         })
         
         return stats
 
 class QAExporter:
     """Exportador de datos Q&A a diferentes formatos"""
-    
+
+    __slots__ = ("supported_formats",)
+
     def __init__(self):
         self.supported_formats = ['csv', 'json', 'xlsx', 'yaml']
     
-    def prepare_export_data(self, items: List[QAItem], include_metadata: bool = True) -> List[Dict[str, Any]]:
-        """Preparar datos para exportación"""
-        export_data = []
-        
-        for item in items:
-            row = {
-                "id": item.id,
-                "pregunta": item.pregunta,
-                "respuesta": item.respuesta,
-                "categoria": item.categoria,
-                "nivel": item.nivel,
-                "tema": item.tema,
-                "idioma": item.idioma,
-                "confianza": item.confianza,
-                "fecha_creacion": item.fecha_creacion.isoformat(),
-                "fuentes": "|".join(item.fuentes) if item.fuentes else "",
-                "palabras_clave": "|".join(item.palabras_clave) if item.palabras_clave else ""
-            }
-            
-            if include_metadata and item.metadatos:
-                # Agregar metadatos como columnas adicionales
+    def prepare_export_dataframe(self, items: List[QAItem], include_metadata: bool = True) -> "pd.DataFrame":
+        """Construir un DataFrame columnar con los items
+
+        Las columnas se arman por listas (SoA) en una sola pasada y la
+        serialización posterior corre en los writers en C de pandas.
+        pandas se importa aquí (y no a nivel de módulo) para no pagar su
+        costo de import en procesos que nunca exportan.
+        """
+        import pandas as pd
+
+        df = pd.DataFrame({
+            "id": [item.id for item in items],
+            "pregunta": [item.pregunta for item in items],
+            "respuesta": [item.respuesta for item in items],
+            "categoria": [item.categoria for item in items],
+            "nivel": [item.nivel for item in items],
+            "tema": [item.tema for item in items],
+            "idioma": [item.idioma for item in items],
+            "confianza": [item.confianza for item in items],
+            "fecha_creacion": [item.fecha_creacion.isoformat() for item in items],
+            "fuentes": ["|".join(item.fuentes) if item.fuentes else "" for item in items],
+            "palabras_clave": ["|".join(item.palabras_clave) if item.palabras_clave else "" for item in items],
+        })
+
+        if include_metadata:
+            # Columnas de metadatos pobladas por índice en un solo barrido
+            meta_cols: Dict[str, list] = {}
+            for indice, item in enumerate(items):
                 for key, value in item.metadatos.items():
-                    row[f"meta_{key}"] = str(value)
-            
-            export_data.append(row)
-        
-        return export_data
-    
+                    col = meta_cols.setdefault(f"meta_{key}", [None] * len(items))
+                    col[indice] = str(value)
+            for col, values in meta_cols.items():
+                df[col] = values
+
+        return df
+
+    def prepare_export_data(self, items: List[QAItem], include_metadata: bool = True) -> List[Dict[str, Any]]:
+        """Preparar datos para exportación (filas como dicts)"""
+        return self.prepare_export_dataframe(items, include_metadata).to_dict(orient="records")
+
+    def _json_envelope(self, df: "pd.DataFrame") -> str:
+        """Estructura JSON de exportación con metadatos y filas"""
+        metadata = json.dumps({
+            "total_items": len(df),
+            "export_date": datetime.now().isoformat(),
+            "format_version": "1.0"
+        }, ensure_ascii=False)
+        qa_items = df.to_json(orient="records", force_ascii=False)
+        return f'{{"metadata": {metadata}, "qa_items": {qa_items}}}'
+
     def export_to_csv(self, items: List[QAItem], file_path: str, include_metadata: bool = True):
         """Exportar a formato CSV"""
-        data = self.prepare_export_data(items, include_metadata)
-        
-        if not data:
+        df = self.prepare_export_dataframe(items, include_metadata)
+
+        if df.empty:
             logger.warning("No hay datos para exportar")
             return
-        
-        # Obtener todas las columnas posibles
-        all_columns = set()
-        for row in data:
-            all_columns.update(row.keys())
-        
-        columns = sorted(all_columns)
-        
-        with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=columns)
-            writer.writeheader()
-            writer.writerows(data)
-        
-        logger.info(f"Exportado a CSV: {file_path} ({len(data)} elementos)")
-    
+
+        df.to_csv(file_path, index=False, encoding='utf-8')
+
+        logger.info(f"Exportado a CSV: {file_path} ({len(df)} elementos)")
+
     def export_to_json(self, items: List[QAItem], file_path: str, include_metadata: bool = True):
         """Exportar a formato JSON"""
+        df = self.prepare_export_dataframe(items, include_metadata)
+
+        with open(file_path, 'w', encoding='utf-8') as jsonfile:
+            jsonfile.write(self._json_envelope(df))
+
+        logger.info(f"Exportado a JSON: {file_path} ({len(df)} elementos)")
+
+    def export_to_xlsx(self, items: List[QAItem], file_path: str, include_metadata: bool = True):
+        """Exportar a formato Excel"""
+        from openpyxl import Workbook
+
+        df = self.prepare_export_dataframe(items, include_metadata)
+
+        # write_only serializa cada fila al vuelo en lugar de mantener
+        # todas las celdas en memoria
+        workbook = Workbook(write_only=True)
+        worksheet = workbook.create_sheet('QA_Data')
+        worksheet.append(list(df.columns))
+        for row in df.itertuples(index=False, name=None):
+            worksheet.append(list(row))
+
+        workbook.save(file_path)
+
+        logger.info(f"Exportado a Excel: {file_path} ({len(df)} elementos)")
+
+    def export_to_yaml(self, items: List[QAItem], file_path: str, include_metadata: bool = True):
+        """Exportar a formato YAML"""
         data = self.prepare_export_data(items, include_metadata)
-        
+
         export_structure = {
             "metadata": {
                 "total_items": len(data),
@@ -232,15 +300,58 @@ class QAExporter:
             },
             "qa_items": data
         }
-        
-        with open(file_path, 'w', encoding='utf-8') as jsonfile:
-            json.dump(export_structure, jsonfile, ensure_ascii=False, indent=2)
-        
-        logger.info(f"Exportado a JSON: {file_path} ({len(data)} elementos)")
-    
-    def export(self, items: List[QAItem], config: ExportConfig):
-        """Exportar usando configuración específica"""
-        # Determinar ruta de archivo
+
+        with open(file_path, 'w', encoding='utf-8') as yamlfile:
+            yaml.dump(
+                export_structure, yamlfile, Dumper=_YAML_DUMPER,
+                default_flow_style=False, allow_unicode=True
+            )
+
+        logger.info(f"Exportado a YAML: {file_path} ({len(data)} elementos)")
+
+    def render_bytes(self, items: List[QAItem], config: ExportConfig) -> bytes:
+        """Serializar los items al formato configurado, en memoria"""
+        df = self.prepare_export_dataframe(items, config.incluir_metadatos)
+
+        if config.formato == "csv":
+            return df.to_csv(index=False).encode('utf-8')
+        elif config.formato == "json":
+            return self._json_envelope(df).encode('utf-8')
+        elif config.formato == "yaml":
+            export_structure = {
+                "metadata": {
+                    "total_items": len(df),
+                    "export_date": datetime.now().isoformat(),
+                    "format_version": "1.0"
+                },
+                "qa_items": df.to_dict(orient="records")
+            }
+            return yaml.dump(
+                export_structure, Dumper=_YAML_DUMPER,
+                default_flow_style=False, allow_unicode=True
+            ).encode('utf-8')
+        elif config.formato == "xlsx":
+            buffer = io.BytesIO()
+            df.to_excel(buffer, index=False, engine='openpyxl')
+            return buffer.getvalue()
+        else:
+            raise ValueError(f"Formato no soportado: {config.formato}")
+
+    def export_with_bytes(self, items: List[QAItem], config: ExportConfig) -> tuple:
+        """Exportar a disco y retornar también el contenido serializado
+
+        Serializa una sola vez y escribe esos mismos bytes, evitando
+        releer el archivo para ofrecerlo en la descarga.
+        """
+        full_path = self._resolve_output_path(config)
+        content = self.render_bytes(items, config)
+        full_path.write_bytes(content)
+
+        logger.info(f"Exportado a {config.formato.upper()}: {full_path} ({len(items)} elementos)")
+        return str(full_path), content
+
+    def _resolve_output_path(self, config: ExportConfig) -> Path:
+        """Determinar la ruta completa de salida según la configuración"""
         if config.ruta_salida:
             output_path = Path(config.ruta_salida)
         else:
@@ -259,20 +370,31 @@ class QAExporter:
         
         full_path = output_path / filename
         full_path.parent.mkdir(parents=True, exist_ok=True)
-        
+        return full_path
+
+    def export(self, items: List[QAItem], config: ExportConfig):
+        """Exportar usando configuración específica"""
+        full_path = self._resolve_output_path(config)
+
         # Exportar según formato
         if config.formato == "csv":
             self.export_to_csv(items, str(full_path), config.incluir_metadatos)
         elif config.formato == "json":
             self.export_to_json(items, str(full_path), config.incluir_metadatos)
+        elif config.formato == "xlsx":
+            self.export_to_xlsx(items, str(full_path), config.incluir_metadatos)
+        elif config.formato == "yaml":
+            self.export_to_yaml(items, str(full_path), config.incluir_metadatos)
         else:
             raise ValueError(f"Formato no soportado: {config.formato}")
-        
+
         return str(full_path)
 
 class QADataManager:
     """Manager principal para unificación y exportación de datos Q&A"""
-    
+
+    __slots__ = ("unifier", "exporter")
+
     def __init__(self):
         self.unifier = QADataUnifier()
         self.exporter = QAExporter()
@@ -299,20 +421,30 @@ class QADataManager:
         self,
         export_config: ExportConfig,
         remove_duplicates: bool = True,
-        similarity_threshold: float = 0.8
-    ) -> str:
-        """Procesar datos y exportar"""
-        
+        similarity_threshold: float = 0.5,
+        return_bytes: bool = False
+    ) -> Union[str, tuple]:
+        """Procesar datos y exportar
+
+        Con `return_bytes=True` retorna `(ruta, contenido)` para que el
+        llamador pueda ofrecer el archivo sin releerlo de disco.
+        """
+
         # Eliminar duplicados si se solicita
         if remove_duplicates:
             self.unifier.merge_similar_items(similarity_threshold)
-        
+
         # Aplicar filtros
         items_to_export = self.unifier.filter_items(export_config.filtros)
-        
+
         # Exportar
+        if return_bytes:
+            output_path, content = self.exporter.export_with_bytes(items_to_export, export_config)
+            logger.info(f"Procesamiento y exportación completados: {output_path}")
+            return output_path, content
+
         output_path = self.exporter.export(items_to_export, export_config)
-        
+
         logger.info(f"Procesamiento y exportación completados: {output_path}")
         return output_path
     
@@ -2,6 +2,7 @@
 Modelos de datos usando Pydantic para validación y estructura
 """
 
+from collections import Counter
 from datetime import datetime
 from typing import List, Optional, Dict, Any, Literal
 from pydantic import BaseModel, Field, validator
@@ -40,6 +41,38 @@ class QAItem(BaseModel):
             return v.lower().strip()
         return v
 
+    @property
+    def texto_busqueda(self) -> tuple:
+        """Pregunta y respuesta en minúsculas, normalizadas una sola vez
+
+        Las búsquedas por subcadena se repiten muchas veces sobre el
+        mismo item; cachear la versión en minúsculas evita re-alocar
+        strings en cada filtro.
+        """
+        cache = self.__dict__.get("_texto_busqueda")
+        if cache is None:
+            cache = (self.pregunta.lower(), self.respuesta.lower())
+            self.__dict__["_texto_busqueda"] = cache
+        return cache
+
+    @property
+    def shingles(self) -> frozenset:
+        """3-gramas de palabras de pregunta+respuesta, calculados una vez
+
+        Base de la similitud Jaccard usada en la deduplicación; cachear
+        el conjunto evita re-tokenizar el item en cada comparación.
+        """
+        cache = self.__dict__.get("_shingles")
+        if cache is None:
+            pregunta, respuesta = self.texto_busqueda
+            tokens = (pregunta + " " + respuesta).split()
+            if len(tokens) < 3:
+                cache = frozenset(tokens)
+            else:
+                cache = frozenset(zip(tokens, tokens[1:], tokens[2:]))
+            self.__dict__["_shingles"] = cache
+        return cache
+
 class QABatch(BaseModel):
     """Modelo para un lote de elementos Q&A"""
     
@@ -60,34 +93,49 @@ class QABatch(BaseModel):
     )
     fecha_creacion: datetime = Field(default_factory=datetime.now)
     
+    def _stats_acc(self) -> Dict[str, Any]:
+        """Acumuladores de estadísticas del lote, mantenidos al día
+
+        Se construyen una vez desde los items actuales y add_item los
+        actualiza incrementalmente; si la lista se mutó por fuera (la
+        cuenta no coincide) se reconstruyen desde cero.
+        """
+        acc = self.__dict__.get("_stats_cache")
+        if acc is None or acc["total"] != len(self.items):
+            acc = {
+                "total": len(self.items),
+                "categorias": Counter(item.categoria for item in self.items),
+                "niveles": Counter(item.nivel for item in self.items),
+                "temas": Counter(item.tema for item in self.items if item.tema),
+                "suma_confianza": sum(item.confianza for item in self.items),
+            }
+            self.__dict__["_stats_cache"] = acc
+        return acc
+
     def add_item(self, item: QAItem):
         """Agregar un item al lote"""
         self.items.append(item)
-    
+        acc = self.__dict__.get("_stats_cache")
+        if acc is not None and acc["total"] == len(self.items) - 1:
+            acc["total"] += 1
+            acc["categorias"][item.categoria] += 1
+            acc["niveles"][item.nivel] += 1
+            if item.tema:
+                acc["temas"][item.tema] += 1
+            acc["suma_confianza"] += item.confianza
+
     def get_stats(self) -> Dict[str, Any]:
         """Obtener estadísticas del lote"""
         if not self.items:
             return {"total": 0}
-        
-        categorias = {}
-        niveles = {}
-        temas = {}
-        
-        for item in self.items:
-            # Contar categorías
-            categorias[item.categoria] = categorias.get(item.categoria, 0) + 1
-            # Contar niveles
-            niveles[item.nivel] = niveles.get(item.nivel, 0) + 1
-            # Contar temas
-            if item.tema:
-                temas[item.tema] = temas.get(item.tema, 0) + 1
-        
+
+        acc = self._stats_acc()
         return {
-            "total": len(self.items),
-            "categorias": categorias,
-            "niveles": niveles,
-            "temas": temas,
-            "confianza_promedio": sum(item.confianza for item in self.items) / len(self.items)
+            "total": acc["total"],
+            "categorias": dict(acc["categorias"]),
+            "niveles": dict(acc["niveles"]),
+            "temas": dict(acc["temas"]),
+            "confianza_promedio": acc["suma_confianza"] / acc["total"]
         }
 
 class GenerationRequest(BaseModel):
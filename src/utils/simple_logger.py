@@ -1,50 +1,25 @@
 """
-Sistema de logging simple sin dependencias externas
+Configuración de logging usando solo la librería estándar
+
+Cada módulo obtiene su logger con ``logging.getLogger(__name__)``; los
+mensajes pasan directo por el despacho en C de ``logging`` sin wrapper
+intermedio. Aquí solo vive la configuración de handler y formato,
+aplicada una vez al arranque de la aplicación.
 """
 
 import logging
 import sys
-from pathlib import Path
 
-class SimpleLogger:
-    """Logger simple usando solo la librería estándar"""
-    
-    def __init__(self, name: str = "qa_generator"):
-        self.logger = logging.getLogger(name)
-        if not self.logger.handlers:
-            self._setup_logger()
-    
-    def _setup_logger(self):
-        """Configurar el logger"""
-        self.logger.setLevel(logging.INFO)
-        
-        # Handler para consola
-        console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setLevel(logging.INFO)
-        
-        # Formato simple
-        formatter = logging.Formatter(
-            '[%(levelname)s] %(name)s: %(message)s'
-        )
-        console_handler.setFormatter(formatter)
-        
-        self.logger.addHandler(console_handler)
-    
-    def info(self, message):
-        """Log info message"""
-        self.logger.info(message)
-    
-    def error(self, message):
-        """Log error message"""
-        self.logger.error(message)
-    
-    def warning(self, message):
-        """Log warning message"""
-        self.logger.warning(message)
+def configure_logging(level: int = logging.INFO):
+    """Configurar el handler raíz de consola (idempotente)"""
+    root = logging.getLogger()
+    if root.handlers:
+        return
 
-# Instancia global
-simple_logger = SimpleLogger()
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setFormatter(logging.Formatter(
+        '[%(levelname)s] %(name)s: %(message)s'
+    ))
 
-def get_logger(name: str = None):
-    """Obtener logger simple"""
-    return simple_logger
\ No newline at end of file
+    root.addHandler(console_handler)
+    root.setLevel(level)
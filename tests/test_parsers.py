@@ -0,0 +1,120 @@
+"""
+Tests para los parsers de Q&A (documentos y respuestas del LLM)
+"""
+
+import pytest
+
+class TestQAExtractor:
+    """Tests para la extracción de Q&A existentes en documentos"""
+
+    @pytest.fixture
+    def extractor(self):
+        """QAExtractor; se omite si faltan sus dependencias"""
+        document_processor = pytest.importorskip("src.extractors.document_processor")
+        return document_processor.QAExtractor()
+
+    def test_pares_con_marcadores(self, extractor):
+        """Test extracción del formato Pregunta:/Respuesta:"""
+        texto = (
+            "Pregunta: ¿Qué es la fotosíntesis y cómo funciona?\n"
+            "Respuesta: Es el proceso por el cual las plantas convierten "
+            "luz en energía química.\n"
+        )
+        pares = extractor.extract_existing_qa(texto)
+
+        assert len(pares) == 1
+        assert pares[0]["pregunta"] == "¿Qué es la fotosíntesis y cómo funciona?"
+        assert pares[0]["respuesta"].startswith("Es el proceso")
+
+    def test_conserva_interrogacion_inicial(self, extractor):
+        """Test de regresión: el ¿ inicial no se pierde tras el marcador"""
+        texto = (
+            "P: ¿Qué es Python?\n"
+            "R: Python es un lenguaje de programación interpretado.\n"
+            "1. ¿Cuál es la capital de Francia? La capital de Francia es "
+            "París, una ciudad europea.\n"
+        )
+        pares = extractor.extract_existing_qa(texto)
+
+        preguntas = [qa["pregunta"] for qa in pares]
+        assert "¿Qué es Python?" in preguntas
+        assert "¿Cuál es la capital de Francia?" in preguntas
+
+    def test_pregunta_inline(self, extractor):
+        """Test del formato ¿...? seguido de la respuesta en el texto"""
+        texto = (
+            "¿Qué es la gravedad en la física clásica? Es la fuerza de "
+            "atracción entre cuerpos con masa según Newton.\n"
+        )
+        pares = extractor.extract_existing_qa(texto)
+
+        assert len(pares) == 1
+        assert pares[0]["pregunta"] == "¿Qué es la gravedad en la física clásica?"
+
+    def test_deduplica_preguntas(self, extractor):
+        """Test que la misma pregunta con otro espaciado cuenta una vez"""
+        texto = (
+            "Pregunta: ¿Qué es Python?\n"
+            "Respuesta: Python es un lenguaje de programación interpretado.\n"
+            "Pregunta: ¿Qué  es  PYTHON?\n"
+            "Respuesta: Python es un lenguaje interpretado multiplataforma.\n"
+        )
+        pares = extractor.extract_existing_qa(texto)
+
+        assert len(pares) == 1
+
+    def test_texto_sin_interrogaciones(self, extractor):
+        """Test del atajo para texto narrativo sin preguntas"""
+        assert extractor.extract_existing_qa("Texto narrativo sin preguntas.") == []
+
+class TestScanQAMarkers:
+    """Tests para el escáner PREGUNTA:/RESPUESTA: de respuestas del LLM"""
+
+    @pytest.fixture
+    def scan(self):
+        """Escáner de marcadores; se omite si faltan sus dependencias"""
+        prompt_generator = pytest.importorskip("src.generators.prompt_generator")
+        return prompt_generator.PromptQAGenerator._scan_qa_markers
+
+    def test_pares_multiples(self, scan):
+        """Test extracción de varios pares del formato esperado"""
+        respuesta = (
+            "PREGUNTA: ¿Qué es Python?\n"
+            "RESPUESTA: Un lenguaje de programación interpretado.\n"
+            "PREGUNTA: ¿Qué es SQL?\n"
+            "RESPUESTA: Un lenguaje de consulta de bases de datos.\n"
+        )
+        matches = scan(respuesta)
+
+        assert len(matches) == 2
+        assert matches[0][0].strip() == "¿Qué es Python?"
+        assert matches[1][1].strip() == "Un lenguaje de consulta de bases de datos."
+
+    def test_insensible_a_mayusculas(self, scan):
+        """Test que los marcadores matchean sin importar mayúsculas"""
+        respuesta = (
+            "Pregunta: ¿Qué es Python?\n"
+            "Respuesta: Un lenguaje de programación interpretado.\n"
+        )
+        matches = scan(respuesta)
+
+        assert len(matches) == 1
+
+    def test_recorta_en_categoria(self, scan):
+        """Test que la respuesta termina donde empieza CATEGORIA:"""
+        respuesta = (
+            "PREGUNTA: ¿Qué es Python?\n"
+            "RESPUESTA: Un lenguaje de programación interpretado.\n"
+            "CATEGORIA: programacion\n"
+        )
+        matches = scan(respuesta)
+
+        assert len(matches) == 1
+        assert "CATEGORIA" not in matches[0][1]
+
+    def test_sin_marcadores(self, scan):
+        """Test que texto sin el formato esperado no produce pares"""
+        assert scan("Texto libre sin estructura de preguntas.") == []
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,266 @@
+"""
+Tests para la deduplicación y unificación de datos Q&A
+"""
+
+import pytest
+from src.utils.data_models import QAItem, QABatch
+from src.unifiers.data_unifier_simple import QADataUnifier as SimpleQADataUnifier
+
+def make_item(pregunta: str, respuesta: str, **kwargs) -> QAItem:
+    """Crear un QAItem de prueba con valores válidos por defecto"""
+    return QAItem(pregunta=pregunta, respuesta=respuesta, **kwargs)
+
+class TestQAItemDerivados:
+    """Tests para los derivados cacheados de QAItem"""
+
+    def test_texto_busqueda(self):
+        """Test texto de búsqueda normalizado en minúsculas"""
+        item = make_item(
+            "¿Qué es PYTHON y para qué sirve?",
+            "Python es un Lenguaje de programación interpretado."
+        )
+
+        assert item.texto_busqueda == (
+            "¿qué es python y para qué sirve?",
+            "python es un lenguaje de programación interpretado."
+        )
+
+    def test_shingles_trigramas(self):
+        """Test shingles como 3-gramas de palabras de pregunta+respuesta"""
+        item = make_item(
+            "¿Qué es la fotosíntesis?",
+            "Es el proceso que convierte luz en energía."
+        )
+
+        assert ("es", "el", "proceso") in item.shingles
+        assert ("luz", "en", "energía.") in item.shingles
+        # El último token de la pregunta encadena con la respuesta
+        assert ("la", "fotosíntesis?", "es") in item.shingles
+
+    def test_shingles_texto_corto(self):
+        """Test fallback a tokens sueltos con menos de 3 palabras"""
+        item = make_item(
+            "¿Fotosíntesis?", "Fotofosforilación-oxidativa.",
+        )
+
+        assert item.shingles == frozenset(
+            {"¿fotosíntesis?", "fotofosforilación-oxidativa."}
+        )
+
+    def test_shingles_iguales_para_textos_iguales(self):
+        """Test que textos idénticos producen shingles idénticos"""
+        a = make_item("¿Qué es Python?", "Un lenguaje de programación interpretado.")
+        b = make_item("¿Qué es Python?", "Un lenguaje de programación interpretado.")
+
+        assert a.shingles == b.shingles
+
+class TestQABatchEstadisticasIncrementales:
+    """Tests para las estadísticas incrementales de QABatch"""
+
+    def test_add_item_actualiza_stats(self):
+        """Test que add_item mantiene las estadísticas al día"""
+        batch = QABatch(items=[], origen="manual")
+        batch.add_item(make_item(
+            "¿Pregunta uno?", "Respuesta uno con suficientes caracteres.",
+            categoria="cat1", nivel="básico", confianza=0.6
+        ))
+        stats = batch.get_stats()
+        assert stats["total"] == 1
+
+        batch.add_item(make_item(
+            "¿Pregunta dos?", "Respuesta dos con suficientes caracteres.",
+            categoria="cat1", nivel="intermedio", confianza=0.8
+        ))
+        stats = batch.get_stats()
+
+        assert stats["total"] == 2
+        assert stats["categorias"]["cat1"] == 2
+        assert stats["niveles"]["básico"] == 1
+        assert stats["confianza_promedio"] == pytest.approx(0.7)
+
+    def test_mutacion_externa_reconstruye_stats(self):
+        """Test que mutar items por fuera de add_item no deja stats viejas"""
+        batch = QABatch(items=[], origen="manual")
+        batch.add_item(make_item(
+            "¿Pregunta uno?", "Respuesta uno con suficientes caracteres.",
+            categoria="cat1"
+        ))
+        batch.get_stats()  # poblar el acumulador
+
+        # Mutación directa de la lista, sin pasar por add_item
+        batch.items.append(make_item(
+            "¿Pregunta dos?", "Respuesta dos con suficientes caracteres.",
+            categoria="cat2"
+        ))
+        stats = batch.get_stats()
+
+        assert stats["total"] == 2
+        assert stats["categorias"] == {"cat1": 1, "cat2": 1}
+
+class TestSimpleQADataUnifier:
+    """Tests para el unificador simple"""
+
+    def _near_duplicates(self):
+        return [
+            make_item(
+                "¿Qué es la fotosíntesis y cómo funciona en las plantas?",
+                "La fotosíntesis es el proceso por el cual las plantas "
+                "convierten la luz solar en energía química usando clorofila.",
+                fuentes=["doc_a"], palabras_clave=["fotosíntesis"]
+            ),
+            make_item(
+                "¿Qué es la fotosíntesis y cómo funciona en las plantas verdes?",
+                "La fotosíntesis es el proceso por el cual las plantas "
+                "convierten la luz solar en energía química usando la clorofila.",
+                fuentes=["doc_b", "doc_a"], palabras_clave=["plantas"]
+            ),
+            make_item(
+                "¿Cuál es la capital de Francia?",
+                "La capital de Francia es París, la ciudad más poblada del país."
+            ),
+        ]
+
+    def test_merge_fusiona_parafraseos(self):
+        """Test que parafraseos cercanos se fusionan con el umbral por defecto"""
+        unifier = SimpleQADataUnifier()
+        unifier.add_batch(QABatch(items=self._near_duplicates(), origen="manual"))
+
+        merged = unifier.merge_similar_items()
+
+        assert merged == 1
+        assert len(unifier.unified_items) == 2
+        # Fuentes y palabras clave fusionadas sin duplicados, en orden
+        sobreviviente = unifier.unified_items[0]
+        assert sobreviviente.fuentes == ["doc_a", "doc_b"]
+        assert sobreviviente.palabras_clave == ["fotosíntesis", "plantas"]
+
+    def test_merge_no_fusiona_distintos(self):
+        """Test que items sin relación no se fusionan"""
+        unifier = SimpleQADataUnifier()
+        unifier.add_batch(QABatch(items=[
+            make_item("¿Qué es Python?", "Un lenguaje de programación interpretado."),
+            make_item("¿Cuál es la capital de Francia?",
+                      "La capital de Francia es París, una ciudad europea."),
+        ], origen="manual"))
+
+        assert unifier.merge_similar_items() == 0
+        assert len(unifier.unified_items) == 2
+
+    def test_merge_conserva_respuesta_mas_larga(self):
+        """Test que la fusión adopta la respuesta significativamente más larga"""
+        corta = "La fotosíntesis convierte la luz solar en energía química."
+        larga = ("La fotosíntesis convierte la luz solar en energía química "
+                 "mediante la clorofila de las hojas, liberando oxígeno y "
+                 "fijando el carbono del aire en azúcares.")
+        unifier = SimpleQADataUnifier()
+        unifier.add_batch(QABatch(items=[
+            make_item("¿Qué hace la fotosíntesis en las plantas?", corta),
+            make_item("¿Qué hace la fotosíntesis en las plantas?", larga),
+        ], origen="manual"))
+
+        assert unifier.merge_similar_items(similarity_threshold=0.4) == 1
+        sobreviviente = unifier.unified_items[0]
+        assert sobreviviente.respuesta == larga
+        # Los shingles cacheados deben reflejar la respuesta nueva
+        assert ("oxígeno", "y", "fijando") in sobreviviente.shingles
+
+    def test_filter_items(self):
+        """Test filtrado por categoría, nivel, tema y confianza"""
+        unifier = SimpleQADataUnifier()
+        unifier.add_batch(QABatch(items=[
+            make_item("¿Qué es Python?", "Un lenguaje de programación interpretado.",
+                      categoria="Programación", tema="Lenguajes",
+                      nivel="básico", confianza=0.9),
+            make_item("¿Qué es SQL?", "Un lenguaje de consulta de bases de datos.",
+                      categoria="datos", nivel="intermedio", confianza=0.5),
+        ], origen="manual"))
+
+        assert len(unifier.filter_items({"categoria": "PROGRAMACIÓN"})) == 1
+        assert len(unifier.filter_items({"nivel": "básico"})) == 1
+        assert len(unifier.filter_items({"tema": "lengu"})) == 1
+        assert len(unifier.filter_items({"confianza_minima": 0.6})) == 1
+        assert len(unifier.filter_items({})) == 2
+
+    def test_clear(self):
+        """Test que clear vacía batches e items"""
+        unifier = SimpleQADataUnifier()
+        unifier.add_batch(QABatch(items=self._near_duplicates(), origen="manual"))
+
+        unifier.clear()
+
+        assert unifier.batches == []
+        assert unifier.unified_items == []
+
+class TestQADataUnifier:
+    """Tests para el unificador principal (MinHash/LSH)"""
+
+    @pytest.fixture
+    def data_unifier(self):
+        """Módulo principal; se omite si faltan sus dependencias"""
+        return pytest.importorskip("src.unifiers.data_unifier")
+
+    def test_duplicado_exacto_en_add_batch(self, data_unifier):
+        """Test que el mismo texto normalizado se fusiona al ingresar"""
+        unifier = data_unifier.QADataUnifier()
+        unifier.add_batch(QABatch(items=[
+            make_item("¿Qué es Python?", "Un lenguaje de programación interpretado.",
+                      fuentes=["doc_a"], confianza=0.6),
+        ], origen="manual"))
+        unifier.add_batch(QABatch(items=[
+            make_item("¿Qué es PYTHON?", "Un lenguaje de Programación interpretado.",
+                      fuentes=["doc_b"], confianza=0.8),
+        ], origen="manual"))
+
+        assert len(unifier) == 1
+        item = unifier.unified_items[0]
+        assert item.fuentes == ["doc_a", "doc_b"]
+        assert item.confianza == pytest.approx(0.7)
+        assert unifier.get_statistics()["confianza_promedio"] == pytest.approx(0.7)
+
+    def test_merge_similar_items(self, data_unifier):
+        """Test fusión de parafraseos vía candidatos LSH"""
+        unifier = data_unifier.QADataUnifier()
+        unifier.add_batch(QABatch(items=[
+            make_item(
+                "¿Qué es la fotosíntesis y cómo funciona en las plantas?",
+                "La fotosíntesis es el proceso por el cual las plantas "
+                "convierten la luz solar en energía química usando clorofila."
+            ),
+            make_item(
+                "¿Qué es la fotosíntesis y cómo funciona en las plantas verdes?",
+                "La fotosíntesis es el proceso por el cual las plantas "
+                "convierten la luz solar en energía química usando la clorofila."
+            ),
+            make_item(
+                "¿Cuál es la capital de Francia?",
+                "La capital de Francia es París, la ciudad más poblada del país."
+            ),
+        ], origen="manual"))
+
+        assert unifier.merge_similar_items() == 1
+        assert len(unifier) == 2
+        # Los acumuladores se reconstruyen tras la fusión
+        assert unifier.get_statistics()["total_items"] == 2
+
+    def test_clear_y_reagregar(self, data_unifier):
+        """Test de regresión: re-agregar el mismo texto tras clear
+
+        Limpiar asignando listas vacías dejaba viva la tabla de
+        duplicados exactos y el item re-agregado se fusionaba contra un
+        objeto huérfano, perdiéndose.
+        """
+        unifier = data_unifier.QADataUnifier()
+        batch = lambda: QABatch(items=[
+            make_item("¿Qué es Python?", "Un lenguaje de programación interpretado."),
+        ], origen="manual")
+        unifier.add_batch(batch())
+
+        unifier.clear()
+
+        assert len(unifier) == 0
+        assert unifier.get_statistics() == {"total": 0}
+        unifier.add_batch(batch())
+        assert len(unifier) == 1
+
+if __name__ == "__main__":
+    pytest.main([__file__])